@@ -1,53 +1,111 @@
-from flask import Flask, render_template, Response, jsonify, request
+from flask import Flask, render_template, Response, jsonify, request, g
 import cv2
-import mediapipe as mp
+from datetime import datetime
+import functools
+import hmac
 import numpy as np
+import os
+import threading
 import time
-from datetime import datetime
+
+import metrics
+from detection_log import DetectionStore
+from frame_source import REPLAY_PREFIX
+from inference import ENGINES
+from session import MAX_LOG_SIZE, ModelWatcher, RecognizerPool, SessionManager
 
 app = Flask(__name__)
 
-# Konfigurasi kamera
-CAMERA_INDEX = 1
-cap = cv2.VideoCapture(CAMERA_INDEX)
+# --- Instrumentasi Request Flask ---
+@app.before_request
+def start_request_timer():
+    g.request_start = time.perf_counter()
 
-if not cap.isOpened():
-    print(f"PERINGATAN: Tidak dapat membuka kamera {CAMERA_INDEX} saat startup.")
-    cap = None # Set ke None agar bisa dicek nanti
-else:
-    # Coba mengatur resolusi kamera ke 16:9 (1280x720)
-    cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
-    cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
+@app.after_request
+def record_request_time(response):
+    # Untuk endpoint streaming, yang terukur hanya waktu handler (bukan durasi stream)
+    start = getattr(g, "request_start", None)
+    if start is not None:
+        metrics.histogram("sibi_http_request_seconds", "Flask handler time per endpoint",
+                          {"endpoint": request.endpoint or "unknown"}).observe(time.perf_counter() - start)
+    return response
+
+# Konfigurasi kamera
+# Index webcam, path video, atau rekaman replay (lihat frame_source.py), misalnya
+# SIBI_CAMERA="replay:recordings/session1.sibirec?speed=max" untuk uji beban tanpa kamera
+CAMERA_INDEX = os.environ.get("SIBI_CAMERA", "1")
+CAMERA_INDEX = int(CAMERA_INDEX) if CAMERA_INDEX.isdigit() else CAMERA_INDEX
+DEFAULT_SESSION_ID = "default"
+# Sesi yang dibuat saat startup: {session_id: camera_index}. Tambahkan entri untuk booth lain,
+# atau buat sesi saat runtime lewat POST /sessions
+CAMERA_SOURCES = {DEFAULT_SESSION_ID: CAMERA_INDEX}
+
+# Konfigurasi stream video (MJPEG)
+STREAM_JPEG_QUALITY = 80  # Kualitas JPEG (1-100), lebih rendah = lebih ringan
+STREAM_OUTPUT_WIDTH = None  # Lebar output stream (misal 640); None = resolusi asli kamera
+STREAM_MAX_FPS = 30  # Batas FPS stream
+
+ROI_INFERENCE = True  # Deteksi pada frame diperkecil, lalu crop ke tangan & lewati frame saat tangan diam
+# Cache prediksi: pakai ulang hasil jika frame/ROI hampir identik (pose ditahan)
+PREDICTION_CACHE_TTL = 0.5  # Umur maksimal hasil cache (detik); 0 = nonaktif
+PREDICTION_CACHE_TOLERANCE = 8  # Maksimal perbedaan per sel thumbnail 16x16 grayscale (0-255)
+
+# Konfigurasi server
+# SIBI_SERVER="production" (default): server WSGI multi-thread waitress; "dev": server pengembangan Flask (debug)
+SERVER_MODE = os.environ.get("SIBI_SERVER", "production")
+SERVER_HOST = '0.0.0.0'  # Agar bisa diakses dari luar localhost
+SERVER_PORT = int(os.environ.get("SIBI_PORT", 5000))
+# Setiap klien /video_feed dan /stream_prediction memakai satu thread server selama terhubung
+# (sebagian besar waktunya menunggu frame/event, bukan memakai CPU). Thread pool dipakai bersama
+# semua sesi, jadi total klien stream dibatasi agar SERVER_RESERVED_THREADS thread selalu tersisa
+# untuk request biasa (/get_prediction, /ready, /admin/*).
+MAX_STREAM_CLIENTS = 40  # Batas klien /video_feed per sesi
+MAX_SSE_CLIENTS = 40  # Batas klien /stream_prediction per sesi
+SERVER_THREADS = 100
+SERVER_RESERVED_THREADS = 10
+MAX_TOTAL_STREAM_CLIENTS = SERVER_THREADS - SERVER_RESERVED_THREADS  # Semua sesi, video + SSE
+STREAM_OUTBUF_BYTES = 1048576  # Buffer kirim per koneksi; klien lambat diblokir di sini lalu melewatkan frame
 
 # Konfigurasi model MediaPipe Gesture Recognizer
-recognizer = None
-try:
-    # Pastikan path 'models/gesture_recognizer.task' benar relatif terhadap lokasi app.py
-    base_options = mp.tasks.BaseOptions(model_asset_path='models/gesture_recognizer.task')
-    options = mp.tasks.vision.GestureRecognizerOptions(base_options=base_options)
-    recognizer = mp.tasks.vision.GestureRecognizer.create_from_options(options)
-    print("Model Gesture Recognizer berhasil dimuat.")
-except Exception as e:
-    print(f"ERROR: Gagal memuat model Gesture Recognizer: {e}")
-    # Aplikasi bisa tetap jalan, tapi get_prediction akan return error
-
-# Variabel global
-detection_log = []   # Untuk menyimpan log deteksi
-MAX_LOG_SIZE = 50    # Batasi ukuran log
-latest_prediction = {"gesture": "Belum ada prediksi", "confidence": 0.0}
-mirror_mode = True  # Default mirror mode (True = mode cermin aktif)
-confidence_threshold = 0.5  # Threshold untuk confidence
-
-# Variabel untuk membangun kalimat
-sentence_buffer = []
-current_gesture = "" # Menyimpan gestur efektif terakhir (setelah threshold & konfirmasi) untuk cek consecutive
-last_prediction_time = time.time()
-prediction_cooldown = 1.0  # Jeda antar penambahan KATA ke kalimat
-consecutive_same_predictions = 0
-required_consecutive = 3  # Butuh 3 prediksi sama berturut-turut untuk konfirmasi
-max_sentence_length = 10  # Maksimal 10 kata dalam kalimat
+# RECOGNITION_ENGINE: "gesture_recognizer" (model .task penuh) atau
+# "landmark" (landmark + classifier ringan .npz dari notebook training)
+RECOGNITION_ENGINE = "gesture_recognizer"
+MODEL_PATHS = {
+    "gesture_recognizer": 'models/gesture_recognizer.task',
+    "landmark": 'models/landmark_classifier.npz',
+}
+MODEL_PATH = MODEL_PATHS[RECOGNITION_ENGINE]
+RECOGNIZER_POOL_SIZE = 2  # Jumlah recognizer yang dipakai bergantian oleh semua sesi
+MODEL_WATCH_INTERVAL = 5.0  # Detik antar pengecekan perubahan file model (muat ulang otomatis)
+# SIBI_ADMIN_TOKEN: jika diisi, endpoint /admin/* membutuhkan header X-Admin-Token;
+# jika tidak, /admin/* hanya menerima request dari localhost
+ADMIN_TOKEN = os.environ.get("SIBI_ADMIN_TOKEN") or None
+LOOPBACK_ADDRESSES = ("127.0.0.1", "::1")
+recognizer_pool = RecognizerPool(MODEL_PATH, size=RECOGNIZER_POOL_SIZE, engine=RECOGNITION_ENGINE)
+# Pastikan path model benar relatif terhadap lokasi app.py
+# Model dimuat & di-warm-up di latar belakang agar server langsung bisa menerima request;
+# status pemuatan bisa dicek di /ready. Jika gagal, get_prediction akan return error
+recognizer_pool.load_async()
+model_watcher = ModelWatcher(recognizer_pool, interval=MODEL_WATCH_INTERVAL)
+model_watcher.start()
+
+# Log deteksi permanen (SQLite) untuk semua sesi; di memori hanya MAX_LOG_SIZE entri terakhir per sesi
+DETECTION_LOG_PATH = 'logs/detections.db'
+DETECTION_LOG_RETENTION_DAYS = 90  # Hapus entri lebih lama dari ini saat startup; None = simpan selamanya
+GET_LOG_MAX_LIMIT = 500  # Batas jumlah entri per halaman /get_log
+detection_store = DetectionStore(DETECTION_LOG_PATH, retention_days=DETECTION_LOG_RETENTION_DAYS)
+
+# Setiap sesi punya kamera, kalimat, log, dan pengaturan sendiri
+session_manager = SessionManager(recognizer_pool, jpeg_quality=STREAM_JPEG_QUALITY, output_width=STREAM_OUTPUT_WIDTH,
+                                 max_fps=STREAM_MAX_FPS, roi_inference=ROI_INFERENCE, log_store=detection_store,
+                                 max_stream_clients=MAX_STREAM_CLIENTS, max_sse_clients=MAX_SSE_CLIENTS,
+                                 cache_ttl=PREDICTION_CACHE_TTL, cache_tolerance=PREDICTION_CACHE_TOLERANCE)
+for session_id, camera_index in CAMERA_SOURCES.items():
+    session_manager.create(session_id, camera_index)
 
 # --- Fungsi Placeholder Frame ---
+# Dibuat saat pertama kali dibutuhkan (bukan saat import) lalu di-cache
+@functools.lru_cache(maxsize=1)
 def create_failed_camera_frame():
     # Buat frame hitam atau dengan pesan error
     frame = np.zeros((720, 1280, 3), dtype=np.uint8)
@@ -62,84 +120,52 @@ def create_failed_camera_frame():
     # Jika encode gagal, kembalikan bytes kosong atau handle error
     return buffer.tobytes() if ret else b''
 
-failed_camera_frame_bytes = create_failed_camera_frame()
+# Ambil sesi dari query string (?session=<id>), default ke sesi utama
+def get_request_session():
+    return session_manager.get(request.args.get('session') or DEFAULT_SESSION_ID)
 
-# Fungsi untuk memproses frame dan memprediksi gesture
-def process_frame(frame):
-    if recognizer is None:
-         return "Model Error", 0.0 # Kembalikan error jika model tidak ada
+def session_not_found():
+    return jsonify({"success": False, "message": "Sesi tidak ditemukan"}), 404
 
-    # Resize frame (pastikan ukurannya sesuai ekspektasi model jika perlu)
-    # frame_resized = cv2.resize(frame, (300, 300)) # Contoh resize jika diperlukan model
-    frame_rgb = cv2.cvtColor(frame, cv2.COLOR_BGR2RGB) # Langsung konversi frame asli
-    mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=frame_rgb)
+# --- Batas Klien Stream Seluruh Proses ---
+stream_slots = threading.BoundedSemaphore(MAX_TOTAL_STREAM_CLIENTS)
 
-    try:
-        recognition_result = recognizer.recognize(mp_image)
-    except Exception as e:
-        print(f"Error saat recognize: {e}")
-        return "Prediction Error", 0.0
-
-    if recognition_result.gestures:
-        # Asumsi gestur teratas adalah yang paling relevan
-        top_gesture = recognition_result.gestures[0][0]
-        confidence = top_gesture.score
-        # Kembalikan hasil mentah, thresholding dilakukan di get_prediction
-        return top_gesture.category_name, confidence
-    # Jika tidak ada gestur terdeteksi oleh model
-    return "Tidak dikenali", 0.0
+def too_many_stream_clients():
+    return jsonify({"success": False, "message": "Server sedang melayani terlalu banyak stream"}), 503
 
 # --- Generator untuk streaming video feed ---
-def generate_frames():
-    global cap, mirror_mode, failed_camera_frame_bytes
+# Klien sudah didaftarkan (add_client) oleh route dan dilepas saat respons ditutup.
+# max_fps = batas FPS khusus klien ini (misalnya tampilan thumbnail); None = ikuti encoder
+def generate_frames(session, max_fps=None):
+    stream_encoder = session.stream_encoder
+    last_encoded_id = 0
+    min_interval = 1.0 / max_fps if max_fps else 0.0
+    next_send_time = 0.0
     while True:
-        # Cek jika objek kamera valid dan terbuka
-        if cap is None or not cap.isOpened():
-            print("Mencoba membuka ulang kamera di generate_frames...")
-            if cap: cap.release() # Release jika ada objek tapi tertutup
-            cap = cv2.VideoCapture(CAMERA_INDEX)
-            if cap.isOpened():
-                cap.set(cv2.CAP_PROP_FRAME_WIDTH, 1280)
-                cap.set(cv2.CAP_PROP_FRAME_HEIGHT, 720)
-                print("Kamera berhasil dibuka ulang.")
-            else:
-                # Jika masih gagal, kirim frame error & tunggu
-                print("Masih gagal membuka kamera.")
-                cap = None # Pastikan tetap None
-                yield (b'--frame\r\n'
-                       b'Content-Type: image/jpeg\r\n\r\n' + failed_camera_frame_bytes + b'\r\n')
-                time.sleep(2) # Tunggu sebelum mencoba lagi
-                continue # Kembali ke awal loop
-
-        # Jika kamera OK, baca frame
-        success, frame = cap.read()
-        if not success:
-            # Jika gagal baca frame, asumsikan kamera terputus
-            print("Gagal membaca frame, kamera mungkin terputus. Mencoba membuka ulang...")
-            cap.release()
-            cap = None # Set ke None agar loop berikutnya coba buka ulang
-            # Kirim frame error sementara
+        if min_interval:
+            wait = next_send_time - time.time()
+            if wait > 0:
+                time.sleep(wait)
+        # Ambil hasil encode terbaru (dipakai bersama semua klien)
+        encoded = stream_encoder.wait_for_encoded(last_encoded_id, timeout=2.0)
+        if encoded is None:
+            if session.closed:
+                return # Sesi dihapus, akhiri stream
+            # Kamera belum siap atau terputus, kirim frame error
+            # (thread capture yang menangani pembukaan ulang kamera)
             yield (b'--frame\r\n'
-                   b'Content-Type: image/jpeg\r\n\r\n' + failed_camera_frame_bytes + b'\r\n')
-            time.sleep(1)
+                   b'Content-Type: image/jpeg\r\n\r\n' + create_failed_camera_frame() + b'\r\n')
+            time.sleep(1.0) # Jangan kirim frame error terus-menerus
             continue # Kembali ke awal loop
 
-        # Proses frame jika berhasil dibaca
-        if mirror_mode:
-            frame = cv2.flip(frame, 1) # Flip horizontal untuk efek cermin
-
-        # Encode frame ke JPEG
-        ret, buffer = cv2.imencode('.jpg', frame)
-        if not ret:
-             print("Gagal encode frame ke JPEG")
-             continue # Lewati frame ini jika encode gagal
-
-        frame_bytes = buffer.tobytes()
+        # Frame yang dilewati karena batas FPS klien bukan "drop" akibat klien lambat
+        if last_encoded_id and encoded[0] > last_encoded_id + 1 and not min_interval:
+            session.stream_frames_dropped.inc(encoded[0] - last_encoded_id - 1)
+        last_encoded_id, frame_bytes = encoded
+        next_send_time = time.time() + min_interval
         # Kirim frame sebagai bagian dari stream multipart
         yield (b'--frame\r\n'
                b'Content-Type: image/jpeg\r\n\r\n' + frame_bytes + b'\r\n')
-        # Tambahkan jeda kecil jika CPU usage terlalu tinggi
-        # time.sleep(0.01)
 
 # --- Route Utama ---
 @app.route('/')
@@ -150,142 +176,233 @@ def index():
 # --- Route untuk Video Feed ---
 @app.route('/video_feed')
 def video_feed():
-    # Pastikan model recognizer siap sebelum memulai stream
-    if recognizer is None:
+    session = get_request_session()
+    if session is None:
+        return "Error: Session not found.", 404
+    # Stream boleh berjalan selama model masih dimuat, tapi tidak jika pemuatan gagal
+    if not recognizer_pool.ready and not recognizer_pool.loading:
          # Kembalikan error server jika model tidak bisa dimuat
          return "Error: Gesture recognizer model not loaded.", 500
+    # ?fps=<n> membatasi FPS untuk klien ini saja
+    client_fps = request.args.get('fps', type=float)
+    if client_fps is not None and client_fps <= 0:
+        client_fps = None
+    stream_encoder = session.stream_encoder
+    if not stream_slots.acquire(blocking=False):
+        return too_many_stream_clients()
+    if not stream_encoder.add_client():
+        stream_slots.release()
+        return "Error: Too many viewers for this camera.", 503
     # Mulai stream menggunakan generator generate_frames
-    return Response(generate_frames(), mimetype='multipart/x-mixed-replace; boundary=frame')
+    response = Response(generate_frames(session, client_fps), mimetype='multipart/x-mixed-replace; boundary=frame')
+    # Dipanggil server saat klien memutus koneksi (juga jika generator belum sempat berjalan)
+    response.call_on_close(stream_encoder.remove_client)
+    response.call_on_close(stream_slots.release)
+    return response
+
+# --- Route untuk Readiness / Health Check ---
+@app.route('/health')
+def health():
+    # Server hidup dan bisa menerima request (tanpa menunggu kamera/model)
+    return jsonify({"status": "ok"})
+
+@app.route('/ready')
+def ready():
+    # Siap melayani jika model sudah dimuat dan semua kamera sesi terbuka
+    model = recognizer_pool.status()
+    sessions = {session.session_id: {"camera_index": session.camera_index, "camera_opened": session.camera.is_opened()}
+                for session in session_manager.list()}
+    is_ready = model["ready"] and all(s["camera_opened"] for s in sessions.values())
+    return jsonify({"ready": is_ready, "model": model, "sessions": sessions}), 200 if is_ready else 503
 
 # --- Route untuk Mendapatkan Prediksi ---
 @app.route('/get_prediction', methods=['GET'])
 def get_prediction():
-    global cap, latest_prediction, mirror_mode, current_gesture, last_prediction_time
-    global consecutive_same_predictions, sentence_buffer, confidence_threshold
-    global detection_log
-
-    current_time = time.time()
-
-    # Validasi awal: Kamera dan Model harus siap
-    if cap is None or not cap.isOpened():
-        latest_prediction = {"gesture": "Gagal Membuka Kamera", "confidence": 0.0, "sentence": " ".join(sentence_buffer)}
-        return jsonify(latest_prediction)
-    if recognizer is None:
-         latest_prediction = {"gesture": "Model Error", "confidence": 0.0, "sentence": " ".join(sentence_buffer)}
-         return jsonify(latest_prediction)
-
-    # Baca frame terbaru dari kamera
-    success, frame = cap.read()
-    if not success:
-        # Jika gagal baca frame (meskipun sudah dicek di generate_frames)
-        latest_prediction = {"gesture": "Gagal Membaca Frame", "confidence": 0.0, "sentence": " ".join(sentence_buffer)}
-        return jsonify(latest_prediction)
-
-    # Apply mirror jika aktif (untuk konsistensi dengan video feed)
-    if mirror_mode:
-        frame = cv2.flip(frame, 1)
-
-    # Lakukan prediksi pada frame saat ini
-    detected_gesture_this_cycle, confidence_this_cycle = process_frame(frame)
-
-    # --- Logika Cooldown dan Konfirmasi untuk Penambahan Kalimat ---
-    # Cek apakah waktu cooldown antar *penambahan kata* sudah terlewati
-    if current_time - last_prediction_time >= prediction_cooldown:
-        # Tentukan gestur efektif untuk konfirmasi (setelah threshold)
-        if confidence_this_cycle < confidence_threshold or detected_gesture_this_cycle in ["Model Error", "Prediction Error"]:
-             effective_gesture = "Tidak dikenali"
-        else:
-             effective_gesture = detected_gesture_this_cycle
-
-        # Bandingkan gestur efektif saat ini dengan gestur efektif dari siklus *sebelumnya* (current_gesture)
-        if effective_gesture == current_gesture and effective_gesture != "Tidak dikenali":
-            consecutive_same_predictions += 1 # Tambah hitungan jika sama
-        else:
-            # Jika gestur efektif berubah (atau dari 'Tidak Dikenali' ke valid), reset counter
-            current_gesture = effective_gesture # Update state gestur efektif terakhir
-            consecutive_same_predictions = 1 # Mulai hitung dari 1 untuk gestur baru ini
-
-        # Cek apakah jumlah deteksi berturut-turut sudah memenuhi syarat
-        if consecutive_same_predictions >= required_consecutive:
-            # Hanya proses jika gestur efektif saat ini valid (bukan 'Tidak Dikenali')
-            if current_gesture != "Tidak dikenali":
-                 # --- MODIFIKASI: Langsung tambahkan gestur terkonfirmasi ke buffer ---
-                 sentence_buffer.append(current_gesture)
-
-                 # --- Aksi setelah penambahan berhasil ---
-                 # 1. Log Deteksi
-                 timestamp = datetime.now().strftime('%H:%M:%S') # Format Waktu
-                 log_entry = {
-                     "timestamp": timestamp,
-                     "gesture": current_gesture,
-                     "confidence": round(confidence_this_cycle, 2) # Log confidence asli dari siklus ini
-                 }
-                 detection_log.append(log_entry)
-                 # Jaga ukuran log
-                 if len(detection_log) > MAX_LOG_SIZE:
-                     detection_log.pop(0) # Hapus entri terlama
-
-                 # 2. Reset counter consecutive HANYA setelah berhasil menambah kata
-                 consecutive_same_predictions = 0
-
-                 # 3. Batasi panjang kalimat
-                 if len(sentence_buffer) > max_sentence_length:
-                     sentence_buffer = sentence_buffer[-max_sentence_length:]
-                 # --- Akhir Aksi Setelah Penambahan ---
-
-        # Reset waktu cooldown (last_prediction_time) setelah siklus pengecekan ini selesai
-        last_prediction_time = current_time
-    # --- Akhir Logika Cooldown dan Konfirmasi ---
-
-    # Siapkan respons JSON untuk dikirim ke frontend
-    # Kembalikan hasil deteksi MENTAH dari siklus INI untuk ditampilkan di #result
-    latest_prediction = {
-        "gesture": detected_gesture_this_cycle,
-        "confidence": round(confidence_this_cycle, 2),
-        "sentence": " ".join(sentence_buffer) # Kalimat yang sudah terbangun (terkonfirmasi)
-    }
-
-    return jsonify(latest_prediction)
-
+    session = get_request_session()
+    if session is None:
+        return session_not_found()
+    # Hasil diambil dari cache worker inferensi sesi (tanpa menjalankan model di sini)
+    return jsonify(session.get_prediction())
+
+# --- Route untuk Stream Prediksi (Server-Sent Events) ---
+@app.route('/stream_prediction')
+def stream_prediction():
+    # Klien menerima event 'prediction', 'sentence' dan 'log' hanya saat ada perubahan,
+    # sebagai pengganti polling /get_prediction dan /get_log
+    session = get_request_session()
+    if session is None:
+        return session_not_found()
+    initial_events = []
+    result = session.inference_worker.get_result()
+    if result is not None:
+        initial_events.append(("prediction", {"gesture": result["gesture"], "confidence": round(result["confidence"], 2)}))
+    initial_events.append(("sentence", {"sentence": session.get_sentence()}))
+    if not stream_slots.acquire(blocking=False):
+        return too_many_stream_clients()
+    q = session.events.subscribe()
+    if q is None:
+        stream_slots.release()
+        return jsonify({"success": False, "message": "Terlalu banyak klien stream prediksi"}), 503
+    response = Response(session.events.stream(initial_events, q=q), mimetype='text/event-stream',
+                        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"})
+    response.call_on_close(lambda: session.events.unsubscribe(q))
+    response.call_on_close(stream_slots.release)
+    return response
+
+# --- Route untuk Manajemen Sesi ---
+@app.route('/sessions', methods=['GET'])
+def list_sessions():
+    return jsonify({"sessions": [session.describe() for session in session_manager.list()]})
+
+@app.route('/sessions', methods=['POST'])
+def create_session():
+    # Membuat sesi baru untuk kamera lain (misalnya booth kedua); membuka kamera/file
+    # sembarang, jadi dilindungi seperti endpoint /admin/*
+    error = admin_unauthorized()
+    if error:
+        return error
+    data = request.get_json()
+    try:
+        session_id = str(data['session_id']).strip()
+        camera_index = data['camera_index']
+        # Index webcam, atau rekaman replay ("replay:<file>?...") untuk uji beban
+        if not (isinstance(camera_index, str) and camera_index.startswith(REPLAY_PREFIX)):
+            camera_index = int(camera_index)
+    except (KeyError, ValueError, TypeError):
+        return jsonify({"success": False, "message": "session_id dan camera_index wajib diisi"}), 400
+    if not session_id:
+        return jsonify({"success": False, "message": "session_id tidak boleh kosong"}), 400
+    try:
+        session = session_manager.create(session_id, camera_index)
+    except ValueError as e:
+        return jsonify({"success": False, "message": str(e)}), 409
+    return jsonify({"success": True, "session": session.describe()})
+
+@app.route('/sessions/<session_id>', methods=['DELETE'])
+def delete_session(session_id):
+    error = admin_unauthorized()
+    if error:
+        return error
+    if session_manager.remove(session_id) is None:
+        return session_not_found()
+    return jsonify({"success": True, "message": f"Sesi '{session_id}' dihentikan"})
+
+# --- Route untuk Metrik (format teks Prometheus) ---
+@app.route('/metrics')
+def metrics_endpoint():
+    return Response(metrics.render(), mimetype='text/plain; version=0.0.4')
 
 # --- Endpoint untuk Operasi Lain ---
 
+# Waktu untuk filter /get_log: epoch detik atau ISO 8601 (misal 2024-05-01T08:00:00)
+def parse_log_time(value):
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        return datetime.fromisoformat(value).timestamp()
+
 @app.route('/get_log', methods=['GET'])
 def get_log():
     # Mengembalikan riwayat deteksi (log)
-    global detection_log
-    # Balik urutan agar yang terbaru di atas saat ditampilkan
-    return jsonify({"log": list(reversed(detection_log))})
+    session = get_request_session()
+    if session is None:
+        return session_not_found()
+    args = request.args
+    query_keys = ('since_id', 'before_id', 'start', 'end', 'gesture', 'limit')
+    if not any(key in args for key in query_keys):
+        # Tanpa filter: entri terbaru dari ring buffer di memori (tidak menyentuh disk)
+        return jsonify({"log": session.get_log()})
+
+    # Query berindex ke log permanen:
+    #   ?since_id=<id>           entri setelah id tsb (urut lama -> baru), untuk fetch inkremental
+    #   ?before_id=<id>          halaman berikutnya (urut baru -> lama), pakai next_before_id dari respons
+    #   ?start=&end=             rentang waktu; ?gesture=<label>; ?limit=<n>
+    try:
+        since_id = args.get('since_id', type=int)
+        before_id = args.get('before_id', type=int)
+        start = parse_log_time(args.get('start'))
+        end = parse_log_time(args.get('end'))
+        limit = int(args.get('limit', MAX_LOG_SIZE))
+    except (ValueError, TypeError):
+        return jsonify({"success": False, "message": "Parameter log tidak valid"}), 400
+    if not 1 <= limit <= GET_LOG_MAX_LIMIT:
+        return jsonify({"success": False, "message": f"limit harus antara 1 dan {GET_LOG_MAX_LIMIT}"}), 400
+
+    entries = session.detection_log.query(since_id=since_id, before_id=before_id, start=start, end=end,
+                                          gesture=args.get('gesture'), limit=limit)
+    response = {"log": entries}
+    if entries and len(entries) == limit:
+        if since_id is None:
+            response["next_before_id"] = entries[-1]["id"]
+        else:
+            response["next_since_id"] = entries[-1]["id"]
+    return jsonify(response)
 
 @app.route('/toggle_mirror', methods=['POST'])
 def toggle_mirror():
     # Mengaktifkan/menonaktifkan mode cermin
-    global mirror_mode
+    session = get_request_session()
+    if session is None:
+        return session_not_found()
     data = request.get_json()
     # Jika 'non_mirror' True, maka mirror_mode False, dan sebaliknya
-    mirror_mode = not data.get('non_mirror', False)
-    print(f"Mirror mode set to: {mirror_mode}") # Debug
-    return jsonify({"mirror_mode": mirror_mode})
+    session.set_mirror(not data.get('non_mirror', False))
+    print(f"[{session.session_id}] Mirror mode set to: {session.mirror_mode}") # Debug
+    return jsonify({"mirror_mode": session.mirror_mode})
+
+@app.route('/update_stream_settings', methods=['POST'])
+def update_stream_settings():
+    # Memperbarui kualitas JPEG, lebar output, dan batas FPS stream video
+    session = get_request_session()
+    if session is None:
+        return session_not_found()
+    stream_encoder = session.stream_encoder
+    data = request.get_json()
+    try:
+        quality = int(data.get('quality', stream_encoder.jpeg_quality))
+        width = data.get('width', stream_encoder.output_width)
+        width = int(width) if width else None # 0/null = resolusi asli
+        max_fps = data.get('max_fps', stream_encoder.max_fps)
+        max_fps = float(max_fps) if max_fps else None # 0/null = tanpa batas FPS
+    except (ValueError, TypeError):
+        return jsonify({"success": False, "message": "Pengaturan stream tidak valid"}), 400
+    if not 1 <= quality <= 100:
+        return jsonify({"success": False, "message": "Kualitas JPEG harus antara 1 dan 100"}), 400
+    if width is not None and width < 160:
+        return jsonify({"success": False, "message": "Lebar output minimal 160 piksel"}), 400
+    if max_fps is not None and max_fps < 0:
+        return jsonify({"success": False, "message": "FPS stream tidak boleh negatif (0 = tanpa batas)"}), 400
+    stream_encoder.jpeg_quality = quality
+    stream_encoder.output_width = width
+    stream_encoder.max_fps = max_fps
+    print(f"[{session.session_id}] Stream settings updated: quality={quality}, width={width}, max_fps={max_fps}") # Debug
+    return jsonify({"success": True, "quality": quality, "width": width, "max_fps": max_fps})
 
 @app.route('/clear_sentence', methods=['POST'])
 def clear_sentence():
     # Menghapus kalimat yang sudah terbentuk
-    global sentence_buffer
-    sentence_buffer = []
-    print("Sentence buffer cleared.") # Debug
+    session = get_request_session()
+    if session is None:
+        return session_not_found()
+    session.clear_sentence()
+    print(f"[{session.session_id}] Sentence buffer cleared.") # Debug
     return jsonify({"success": True, "message": "Kalimat telah dihapus"})
 
 @app.route('/update_threshold', methods=['POST'])
 def update_threshold():
     # Memperbarui ambang batas kepercayaan
-    global confidence_threshold
+    session = get_request_session()
+    if session is None:
+        return session_not_found()
     data = request.get_json()
     try:
         new_threshold = float(data.get('threshold', 0.5))
         if 0.0 <= new_threshold <= 1.0:
-             confidence_threshold = new_threshold
-             print(f"Confidence threshold updated to: {confidence_threshold}") # Debug
-             return jsonify({"success": True, "threshold": confidence_threshold})
+             session.decoder.threshold = new_threshold
+             print(f"[{session.session_id}] Confidence threshold updated to: {new_threshold}") # Debug
+             return jsonify({"success": True, "threshold": new_threshold})
         else:
              return jsonify({"success": False, "message": "Threshold harus antara 0.0 dan 1.0"}), 400
     except (ValueError, TypeError):
@@ -293,15 +410,17 @@ def update_threshold():
 
 @app.route('/update_cooldown', methods=['POST'])
 def update_cooldown():
-    # Memperbarui jeda waktu antar penambahan kata
-    global prediction_cooldown
+    # Memperbarui jeda waktu minimal antar penambahan kata
+    session = get_request_session()
+    if session is None:
+        return session_not_found()
     data = request.get_json()
     try:
         new_cooldown = float(data.get('cooldown', 1.0))
         if new_cooldown >= 0.1: # Beri batas minimal
-             prediction_cooldown = new_cooldown
-             print(f"Prediction cooldown updated to: {prediction_cooldown}") # Debug
-             return jsonify({"success": True, "cooldown": prediction_cooldown})
+             session.decoder.min_word_gap = new_cooldown
+             print(f"[{session.session_id}] Prediction cooldown updated to: {new_cooldown}") # Debug
+             return jsonify({"success": True, "cooldown": new_cooldown})
         else:
             return jsonify({"success": False, "message": "Cooldown minimal 0.1 detik"}), 400
     except (ValueError, TypeError):
@@ -309,40 +428,117 @@ def update_cooldown():
 
 @app.route('/update_consecutive', methods=['POST'])
 def update_consecutive():
-    # Memperbarui jumlah prediksi beruntun yang diperlukan
-    global required_consecutive
+    # Memperbarui jumlah hasil inferensi beruntun yang diperlukan untuk konfirmasi kata
+    session = get_request_session()
+    if session is None:
+        return session_not_found()
     data = request.get_json()
     try:
         new_consecutive = int(data.get('consecutive', 3))
         if new_consecutive >= 1: # Minimal 1
-             required_consecutive = new_consecutive
-             print(f"Required consecutive predictions updated to: {required_consecutive}") # Debug
-             return jsonify({"success": True, "consecutive": required_consecutive})
+             session.decoder.min_frames = new_consecutive
+             print(f"[{session.session_id}] Required consecutive predictions updated to: {new_consecutive}") # Debug
+             return jsonify({"success": True, "consecutive": new_consecutive})
         else:
              return jsonify({"success": False, "message": "Prediksi beruntun minimal 1"}), 400
     except (ValueError, TypeError):
         return jsonify({"success": False, "message": "Nilai prediksi beruntun tidak valid"}), 400
 
-# --- Menjalankan Aplikasi Flask ---
+@app.route('/update_decoder', methods=['POST'])
+def update_decoder():
+    # Memperbarui tradeoff latensi vs stabilitas decoder kalimat
+    session = get_request_session()
+    if session is None:
+        return session_not_found()
+    decoder = session.decoder
+    data = request.get_json()
+    try:
+        smoothing = float(data.get('smoothing', decoder.smoothing))
+        hold_time = float(data.get('hold_time', decoder.hold_time))
+        repeat_after = data.get('repeat_after', decoder.repeat_after)
+        repeat_after = float(repeat_after) if repeat_after else None # 0/null = tidak mengulang kata
+    except (ValueError, TypeError):
+        return jsonify({"success": False, "message": "Pengaturan decoder tidak valid"}), 400
+    if smoothing < 0 or hold_time < 0:
+        return jsonify({"success": False, "message": "Smoothing dan hold_time tidak boleh negatif"}), 400
+    with session.lock:
+        decoder.smoothing = smoothing
+        decoder.hold_time = hold_time
+        decoder.repeat_after = repeat_after
+    print(f"[{session.session_id}] Decoder settings updated: {decoder.get_settings()}") # Debug
+    return jsonify(dict(success=True, **decoder.get_settings()))
+
+# --- Endpoint Admin Model ---
+def admin_unauthorized():
+    if ADMIN_TOKEN is None:
+        # Server mendengarkan di 0.0.0.0: tanpa token, hanya klien lokal yang boleh
+        if request.remote_addr not in LOOPBACK_ADDRESSES:
+            return jsonify({"success": False, "message": "Endpoint admin hanya dari localhost (SIBI_ADMIN_TOKEN tidak diatur)"}), 403
+        return None
+    if not hmac.compare_digest(request.headers.get('X-Admin-Token', '').encode(), ADMIN_TOKEN.encode()):
+        return jsonify({"success": False, "message": "Token admin tidak valid"}), 403
+    return None
+
+@app.route('/admin/model', methods=['GET'])
+def model_status():
+    # Status model aktif (path, engine, generasi, error terakhir)
+    error = admin_unauthorized()
+    if error:
+        return error
+    return jsonify(recognizer_pool.status())
+
+@app.route('/admin/reload_model', methods=['POST'])
+def reload_model():
+    # Memuat model baru di latar belakang (dengan warm-up), lalu menukarnya tanpa menghentikan stream
+    error = admin_unauthorized()
+    if error:
+        return error
+    data = request.get_json(silent=True) or {}
+    model_path = data.get('model_path') or recognizer_pool.model_path
+    engine = data.get('engine') or recognizer_pool.engine
+    if engine not in ENGINES:
+        return jsonify({"success": False, "message": f"Engine harus salah satu dari {list(ENGINES)}"}), 400
+    if not os.path.isfile(model_path):
+        return jsonify({"success": False, "message": f"File model tidak ditemukan: {model_path}"}), 400
+    if not recognizer_pool.load_async(model_path, engine):
+        return jsonify({"success": False, "message": "Model lain sedang dimuat"}), 409
+    print(f"Memuat model baru: {model_path} ({engine})") # Debug
+    return jsonify({"success": True, "message": "Model sedang dimuat", "status": recognizer_pool.status()}), 202
+
+# --- Menjalankan Server ---
+def run_server():
+    if SERVER_MODE == "dev":
+        # Server pengembangan Flask (debug). use_reloader=False penting jika ada state global & hardware access
+        app.run(debug=True, host=SERVER_HOST, port=SERVER_PORT, use_reloader=False)
+        return
+    try:
+        from waitress import serve
+    except ImportError:
+        print("PERINGATAN: waitress tidak terpasang (pip install waitress), memakai server Flask multi-thread.")
+        app.run(debug=False, host=SERVER_HOST, port=SERVER_PORT, threaded=True, use_reloader=False)
+        return
+    print(f"Server produksi (waitress, {SERVER_THREADS} thread) di http://{SERVER_HOST}:{SERVER_PORT}")
+    serve(app, host=SERVER_HOST, port=SERVER_PORT, threads=SERVER_THREADS,
+          connection_limit=SERVER_THREADS + 50, outbuf_high_watermark=STREAM_OUTBUF_BYTES)
+
 if __name__ == '__main__':
     try:
-        detection_log = [] # Kosongkan log saat start
-        # Pastikan model sudah siap sebelum menjalankan server
-        if recognizer is None:
+        # Model dimuat di latar belakang; beri peringatan jika file model tidak ada
+        if not os.path.isfile(MODEL_PATH):
              print("############################################################")
              print("ERROR: Model Gesture Recognizer tidak dapat dimuat.")
-             print("Pastikan file 'models/gesture_recognizer.task' ada dan valid.")
-             print("Aplikasi tidak dapat dimulai tanpa model.")
+             print(f"Pastikan file '{MODEL_PATH}' ada dan valid.")
+             print("Deteksi tidak akan berjalan tanpa model (cek status di /ready).")
              print("############################################################")
              # Exit jika model gagal load? Atau biarkan jalan tapi fitur deteksi error?
              # exit(1) # Uncomment jika ingin menghentikan aplikasi
-        # Jalankan server Flask
-        # host='0.0.0.0' agar bisa diakses dari luar localhost
-        # use_reloader=False penting jika ada state global & hardware access
-        app.run(debug=True, host='0.0.0.0', port=5000, use_reloader=False)
+        # Jalankan server (lihat SERVER_MODE)
+        run_server()
     finally:
         # Pastikan kamera dilepas saat aplikasi berhenti
         print("Releasing camera...")
-        if cap and cap.isOpened():
-            cap.release()
+        model_watcher.stop()
+        session_manager.stop_all()
+        recognizer_pool.close()
+        detection_store.close()
         print("Application stopped.")
\ No newline at end of file
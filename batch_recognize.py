@@ -0,0 +1,176 @@
+import argparse
+import csv
+import json
+import os
+import time
+from multiprocessing import Pool
+
+import cv2
+
+from inference import ENGINES, create_engine
+
+IMAGE_EXTENSIONS = ('.jpg', '.jpeg', '.png', '.bmp')
+VIDEO_EXTENSIONS = ('.mp4', '.avi', '.mov', '.mkv', '.webm')
+FIELDNAMES = ["source", "frame", "timestamp_ms", "label", "gesture", "confidence", "inference_ms"]
+
+# Engine milik masing-masing proses worker (dibuat sekali per proses)
+_engine = None
+
+def _init_worker(engine, model_path):
+    global _engine
+    # Batasi thread OpenCV per proses agar tidak berebut core dengan worker lain
+    cv2.setNumThreads(1)
+    _engine = create_engine(engine, model_path)
+
+def _predict(image, mirror):
+    start = time.perf_counter()
+    try:
+        gesture, confidence, _, _ = _engine.recognize(image, mirror)
+    except Exception as e:
+        print(f"Error saat recognize: {e}")
+        gesture, confidence = "Prediction Error", 0.0
+    return gesture, round(confidence, 4), round((time.perf_counter() - start) * 1000, 2)
+
+# Proses sekumpulan gambar: task = ("images", [(path, label), ...], mirror)
+def _process_images(items, mirror):
+    rows = []
+    for path, label in items:
+        image = cv2.imread(path)
+        if image is None:
+            print(f"PERINGATAN: Gagal membaca gambar {path}")
+            continue
+        gesture, confidence, inference_ms = _predict(image, mirror)
+        rows.append({"source": path, "frame": 0, "timestamp_ms": 0.0, "label": label,
+                     "gesture": gesture, "confidence": confidence, "inference_ms": inference_ms})
+    return rows
+
+# Proses satu segmen video: task = ("video", path, start_frame, end_frame, step, mirror)
+# Setiap worker men-decode segmennya sendiri secara streaming (frame per frame)
+def _process_video_segment(path, start_frame, end_frame, step, mirror):
+    rows = []
+    cap = cv2.VideoCapture(path)
+    if not cap.isOpened():
+        print(f"PERINGATAN: Gagal membuka video {path}")
+        return rows
+    if start_frame > 0:
+        cap.set(cv2.CAP_PROP_POS_FRAMES, start_frame)
+    frame_index = start_frame
+    try:
+        while end_frame is None or frame_index < end_frame:
+            if (frame_index - start_frame) % step != 0:
+                # Lewati frame tanpa decode penuh
+                if not cap.grab():
+                    break
+                frame_index += 1
+                continue
+            success, frame = cap.read()
+            if not success:
+                break
+            timestamp_ms = cap.get(cv2.CAP_PROP_POS_MSEC)
+            gesture, confidence, inference_ms = _predict(frame, mirror)
+            rows.append({"source": path, "frame": frame_index, "timestamp_ms": round(timestamp_ms, 1), "label": "",
+                         "gesture": gesture, "confidence": confidence, "inference_ms": inference_ms})
+            frame_index += 1
+    finally:
+        cap.release()
+    return rows
+
+def _run_task(task):
+    if task[0] == "images":
+        return _process_images(*task[1:])
+    return _process_video_segment(*task[1:])
+
+# Kumpulkan gambar dari folder. Untuk layout dataset SIBI (root/<label>/<gambar>),
+# nama subfolder dipakai sebagai label agar hasil bisa langsung dievaluasi.
+def _iter_images(directory):
+    for root, dirs, files in os.walk(directory):
+        dirs.sort()
+        label = os.path.relpath(root, directory)
+        label = "" if label == "." else label.replace(os.sep, "/")
+        for name in sorted(files):
+            if name.lower().endswith(IMAGE_EXTENSIONS):
+                yield os.path.join(root, name), label
+
+# Bagi input menjadi task untuk pool. Gambar dikirim per batch, video per segmen frame.
+def iter_tasks(inputs, segment_frames=300, step=1, mirror=False, image_batch=32):
+    for path in inputs:
+        if os.path.isdir(path):
+            batch = []
+            for item in _iter_images(path):
+                batch.append(item)
+                if len(batch) >= image_batch:
+                    yield ("images", batch, mirror)
+                    batch = []
+            if batch:
+                yield ("images", batch, mirror)
+        elif path.lower().endswith(IMAGE_EXTENSIONS):
+            yield ("images", [(path, "")], mirror)
+        elif path.lower().endswith(VIDEO_EXTENSIONS):
+            cap = cv2.VideoCapture(path)
+            frame_count = int(cap.get(cv2.CAP_PROP_FRAME_COUNT)) if cap.isOpened() else 0
+            cap.release()
+            if frame_count <= 0:
+                # Jumlah frame tidak diketahui: proses seluruh video dalam satu segmen
+                yield ("video", path, 0, None, step, mirror)
+                continue
+            # Ukuran segmen kelipatan step agar frame yang diambil tetap konsisten
+            segment = max(step, (segment_frames // step) * step)
+            for start in range(0, frame_count, segment):
+                yield ("video", path, start, min(start + segment, frame_count), step, mirror)
+        else:
+            print(f"PERINGATAN: Input tidak didukung, dilewati: {path}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Batch recognition gestur SIBI untuk file video dan folder gambar.")
+    parser.add_argument("inputs", nargs="+", help="File video, file gambar, atau folder gambar (mis. dataset SIBI)")
+    parser.add_argument("-o", "--output", required=True, help="File output prediksi (.csv atau .jsonl)")
+    parser.add_argument("--engine", default="gesture_recognizer", choices=ENGINES, help="Engine pengenalan")
+    parser.add_argument("--model", default="models/gesture_recognizer.task",
+                        help="Path model (.task untuk gesture_recognizer, .npz untuk landmark)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Jumlah proses worker")
+    parser.add_argument("--step", type=int, default=1, help="Proses setiap N frame video")
+    parser.add_argument("--segment-frames", type=int, default=300, help="Jumlah frame video per task worker")
+    parser.add_argument("--image-batch", type=int, default=32, help="Jumlah gambar per task worker")
+    parser.add_argument("--mirror", action="store_true", help="Flip horizontal seperti mode cermin di app.py")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.model):
+        parser.error(f"File model tidak ditemukan: {args.model}")
+    if args.step < 1:
+        parser.error("--step minimal 1")
+
+    use_jsonl = args.output.lower().endswith((".jsonl", ".json"))
+    tasks = iter_tasks(args.inputs, segment_frames=args.segment_frames, step=args.step,
+                       mirror=args.mirror, image_batch=args.image_batch)
+
+    total = 0
+    labeled = 0
+    correct = 0
+    start = time.time()
+    with open(args.output, "w", newline="", encoding="utf-8") as f, \
+         Pool(processes=max(1, args.workers), initializer=_init_worker, initargs=(args.engine, args.model)) as pool:
+        writer = None if use_jsonl else csv.DictWriter(f, fieldnames=FIELDNAMES)
+        if writer is not None:
+            writer.writeheader()
+        # imap menjaga urutan output sesuai urutan input
+        for rows in pool.imap(_run_task, tasks):
+            for row in rows:
+                if row["label"]:
+                    labeled += 1
+                    correct += row["gesture"] == row["label"]
+                if writer is not None:
+                    writer.writerow(row)
+                else:
+                    f.write(json.dumps(row) + "\n")
+            total += len(rows)
+
+    elapsed = time.time() - start
+    fps = total / elapsed if elapsed > 0 else 0.0
+    print(f"Selesai: {total} frame diproses dalam {elapsed:.1f} detik ({fps:.1f} frame/detik).")
+    if labeled:
+        # Akurasi untuk input berlabel (subfolder dataset), untuk membandingkan model/engine
+        print(f"Akurasi: {100.0 * correct / labeled:.2f}% ({correct}/{labeled} gambar berlabel)")
+    print(f"Hasil disimpan ke {args.output}")
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,278 @@
+import argparse
+import csv
+import hashlib
+import json
+import os
+import platform
+import subprocess
+import sys
+import time
+from datetime import datetime
+
+import cv2
+import numpy as np
+
+try:
+    import resource  # Tidak tersedia di Windows
+except ImportError:
+    resource = None
+
+STAGES = ["jpeg_encode", "recognize_full", "recognize_roi", "recognize_landmark", "find_hands", "find_hands_array",
+          "sentence_decode"]
+
+
+# --- Sumber Frame Benchmark (tanpa kamera) ---
+# Video biasa atau rekaman .sibirec (lihat frame_source.py), dibaca secepat mungkin tanpa loop
+def load_clip_frames(path, max_frames, width, height):
+    from frame_source import RECORDING_EXTENSION, ReplaySource
+    frames = []
+    if path.endswith(RECORDING_EXTENSION):
+        cap = ReplaySource(path, speed=0, loop=False).open()
+    else:
+        cap = cv2.VideoCapture(path)
+    if cap is None or not cap.isOpened():
+        raise SystemExit(f"ERROR: Gagal membuka video {path}")
+    while len(frames) < max_frames:
+        success, frame = cap.read()
+        if not success:
+            break
+        if frame.shape[1] != width or frame.shape[0] != height:
+            frame = cv2.resize(frame, (width, height), interpolation=cv2.INTER_AREA)
+        frames.append(frame)
+    cap.release()
+    if not frames:
+        raise SystemExit(f"ERROR: Video {path} tidak berisi frame")
+    return frames
+
+# Frame sintetis deterministik (seed tetap) agar hasil antar run bisa dibandingkan
+def synthetic_frames(count, width, height, seed=0):
+    rng = np.random.default_rng(seed)
+    base = np.linspace(0, 255, width, dtype=np.float32)[None, :, None]
+    frames = []
+    for i in range(count):
+        noise = rng.integers(0, 32, size=(height, width, 3), dtype=np.uint8)
+        frame = (np.broadcast_to(base, (height, width, 3)) + noise).clip(0, 255).astype(np.uint8)
+        # Lingkaran bergerak sebagai objek sederhana di tengah frame
+        cx = int(width * (0.3 + 0.4 * (i % 30) / 30))
+        cv2.circle(frame, (cx, height // 2), height // 6, (90, 140, 200), -1)
+        frames.append(frame)
+    return frames
+
+
+# Urutan hasil inferensi untuk stage sentence_decode: [(timestamp, label, score, scores)]
+# Dari file prediksi batch_recognize.py (.csv/.jsonl) jika ada, selain itu sintetis:
+# setiap label ditahan ~0.5 detik pada 30 FPS dengan skor ber-noise dan jeda tanpa tangan.
+def load_results(path):
+    with open(path, newline="", encoding="utf-8") as f:
+        if path.lower().endswith((".jsonl", ".json")):
+            rows = [json.loads(line) for line in f if line.strip()]
+        else:
+            rows = list(csv.DictReader(f))
+    if not rows:
+        raise SystemExit(f"ERROR: File hasil {path} kosong")
+    results = []
+    for i, row in enumerate(rows):
+        # Gambar tidak punya timestamp (0); anggap berurutan pada 30 FPS
+        timestamp = float(row["timestamp_ms"] or 0) / 1000 or i / 30.0
+        results.append((timestamp, row["gesture"], float(row["confidence"]), None))
+    return results
+
+def synthetic_results(count, labels=26, fps=30.0, hold_frames=15, gap_frames=5, seed=0):
+    rng = np.random.default_rng(seed)
+    names = [chr(ord("A") + i % 26) for i in range(labels)]
+    results = []
+    for i in range(count):
+        phase = i % (hold_frames + gap_frames)
+        if phase >= hold_frames:
+            results.append((i / fps, "Tidak dikenali", 0.0, {}))
+            continue
+        target = (i // (hold_frames + gap_frames)) % labels
+        probs = rng.dirichlet(np.ones(labels))
+        probs = 0.3 * probs + 0.7 * np.eye(labels)[target]  # Label target dominan, sisanya noise
+        scores = {name: float(p) for name, p in zip(names, probs)}
+        results.append((i / fps, names[target], scores[names[target]], scores))
+    return results
+
+
+# --- Pengukuran ---
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss dalam KB di Linux, dalam byte di macOS
+    return round(peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024, 1)
+
+def run_stage(fn, frames, iterations, warmup):
+    for i in range(warmup):
+        fn(frames[i % len(frames)])
+
+    latencies = []
+    cpu_start = time.process_time()
+    wall_start = time.perf_counter()
+    for i in range(iterations):
+        frame = frames[i % len(frames)]
+        t0 = time.perf_counter()
+        fn(frame)
+        latencies.append((time.perf_counter() - t0) * 1000)
+    wall = time.perf_counter() - wall_start
+    cpu = time.process_time() - cpu_start
+
+    latencies = np.array(latencies)
+    return {
+        "iterations": iterations,
+        "p50_ms": round(float(np.percentile(latencies, 50)), 3),
+        "p95_ms": round(float(np.percentile(latencies, 95)), 3),
+        "p99_ms": round(float(np.percentile(latencies, 99)), 3),
+        "mean_ms": round(float(latencies.mean()), 3),
+        "fps": round(iterations / wall, 1) if wall > 0 else None,
+        "cpu_percent": round(100.0 * cpu / wall, 1) if wall > 0 else None, # >100% = lebih dari satu core
+        "peak_rss_mb": _peak_rss_mb(), # Puncak RSS proses setelah stage ini
+    }
+
+
+# --- Stage yang Diukur ---
+def build_stage(name, args):
+    if name == "jpeg_encode":
+        from streaming import FrameEncoder
+        encoder = FrameEncoder(None, jpeg_quality=args.jpeg_quality, output_width=args.stream_width, mirror=True)
+        return encoder.encode
+
+    if name in ("recognize_full", "recognize_roi"):
+        from frame_buffer import FrameBuffer
+        from inference import RoiTracker, create_recognizer, run_recognizer
+        recognizer = create_recognizer(args.model)
+        buffer = FrameBuffer()
+        if name == "recognize_full":
+            return lambda frame: run_recognizer(recognizer, frame, buffer=buffer)
+        tracker = RoiTracker()
+        return lambda frame: tracker.run(frame, lambda image, mirror: run_recognizer(recognizer, image, mirror, buffer))
+
+    if name == "recognize_landmark":
+        from landmark_classifier import LandmarkEngine
+        return LandmarkEngine(args.landmark_model).recognize
+
+    if name == "sentence_decode":
+        from decoder import SentenceDecoder
+        # Frame diabaikan: setiap panggilan memasukkan satu hasil berikutnya ke decoder
+        results = load_results(args.results) if args.results else synthetic_results(max(args.iterations, 600))
+        decoder = SentenceDecoder()
+        state = {"index": 0, "offset": 0.0}
+        span = results[-1][0] - results[0][0] + 1.0 / 30
+
+        def decode(frame):
+            i = state["index"]
+            timestamp, label, score, scores = results[i]
+            decoder.update(label, score, timestamp + state["offset"], scores)
+            state["index"] = (i + 1) % len(results)
+            if state["index"] == 0:
+                state["offset"] += span  # Ulangi urutan dengan waktu yang terus maju
+        return decode
+
+    if name in ("find_hands", "find_hands_array"):
+        from main import HandDetector
+        detector = HandDetector(maxHands=2)
+        if name == "find_hands":
+            return lambda frame: detector.findHands(frame, draw=False)
+        return detector.findHandsArray
+
+    raise ValueError(f"Stage tidak dikenal: {name}")
+
+
+# --- Metadata Run ---
+def _git_commit():
+    try:
+        return subprocess.check_output(["git", "rev-parse", "--short", "HEAD"], stderr=subprocess.DEVNULL,
+                                       cwd=os.path.dirname(os.path.abspath(__file__))).decode().strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+def _file_sha256(path):
+    if not os.path.exists(path):
+        return None
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+def _library_versions():
+    versions = {"python": platform.python_version(), "opencv": cv2.__version__, "numpy": np.__version__}
+    try:
+        import mediapipe as mp
+        versions["mediapipe"] = mp.__version__
+    except ImportError:
+        pass
+    return versions
+
+
+def print_report(report, baseline=None):
+    print(f"{'stage':<16}{'p50 ms':>10}{'p95 ms':>10}{'p99 ms':>10}{'fps':>9}{'cpu %':>8}{'rss MB':>9}")
+    for name, stats in report["stages"].items():
+        line = (f"{name:<16}{stats['p50_ms']:>10.2f}{stats['p95_ms']:>10.2f}{stats['p99_ms']:>10.2f}"
+                f"{stats['fps'] or 0:>9.1f}{stats['cpu_percent'] or 0:>8.1f}{stats['peak_rss_mb'] or 0:>9.1f}")
+        base = (baseline or {}).get("stages", {}).get(name)
+        if base and base.get("p50_ms"):
+            change = 100.0 * (stats["p50_ms"] - base["p50_ms"]) / base["p50_ms"]
+            line += f"   p50 {change:+.1f}% vs baseline"
+        print(line)
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark pipeline capture -> inferensi -> stream tanpa kamera.")
+    parser.add_argument("--video", help="Klip rekaman (video atau .sibirec) untuk di-replay; default frame sintetis")
+    parser.add_argument("--results", help="Prediksi batch_recognize.py (.csv/.jsonl) untuk stage sentence_decode; "
+                                          "default urutan sintetis")
+    parser.add_argument("--model", default="models/gesture_recognizer.task", help="Path model .task")
+    parser.add_argument("--landmark-model", default="models/landmark_classifier.npz",
+                        help="Classifier .npz untuk stage recognize_landmark")
+    parser.add_argument("--stages", nargs="+", default=STAGES, choices=STAGES, help="Stage yang diukur")
+    parser.add_argument("--frames", type=int, default=120, help="Jumlah frame yang dimuat/dibuat")
+    parser.add_argument("--iterations", type=int, default=300, help="Jumlah iterasi terukur per stage")
+    parser.add_argument("--warmup", type=int, default=10, help="Iterasi pemanasan (tidak diukur)")
+    parser.add_argument("--width", type=int, default=1280)
+    parser.add_argument("--height", type=int, default=720)
+    parser.add_argument("--jpeg-quality", type=int, default=80)
+    parser.add_argument("--stream-width", type=int, default=None, help="Lebar output encode JPEG")
+    parser.add_argument("-o", "--output", help="Simpan hasil ke file JSON")
+    parser.add_argument("--baseline", help="File JSON hasil run sebelumnya untuk dibandingkan")
+    args = parser.parse_args()
+
+    if args.video:
+        frames = load_clip_frames(args.video, args.frames, args.width, args.height)
+    else:
+        frames = synthetic_frames(args.frames, args.width, args.height)
+
+    report = {
+        "created_at": datetime.now().isoformat(timespec="seconds"),
+        "git_commit": _git_commit(),
+        "platform": platform.platform(),
+        "versions": _library_versions(),
+        "model": {"path": args.model, "sha256": _file_sha256(args.model)},
+        "landmark_model": {"path": args.landmark_model, "sha256": _file_sha256(args.landmark_model)},
+        "source": args.video or "synthetic",
+        "resolution": [args.width, args.height],
+        "frames": len(frames),
+        "stages": {},
+    }
+
+    for name in args.stages:
+        print(f"Menjalankan stage {name}...")
+        try:
+            fn = build_stage(name, args)
+        except Exception as e:
+            print(f"PERINGATAN: Stage {name} dilewati: {e}")
+            continue
+        report["stages"][name] = run_stage(fn, frames, args.iterations, args.warmup)
+
+    baseline = None
+    if args.baseline:
+        with open(args.baseline, encoding="utf-8") as f:
+            baseline = json.load(f)
+    print_report(report, baseline)
+
+    if args.output:
+        with open(args.output, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+        print(f"Hasil disimpan ke {args.output}")
+
+if __name__ == "__main__":
+    main()
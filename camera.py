@@ -0,0 +1,126 @@
+import threading
+import time
+from collections import deque
+
+import metrics
+from frame_source import create_source
+
+
+# --- Thread Capture Kamera Bersama ---
+# Satu thread produser membaca kamera pada rate aslinya dan menyimpan frame
+# terbaru ke ring buffer kecil. Semua konsumer (video feed, prediksi, dst.)
+# cukup mengambil frame terbaru dari buffer tanpa menyentuh device kamera.
+# PENTING: frame di buffer dipakai bersama, jangan dimodifikasi in-place.
+# camera_index boleh berupa index webcam, path video, atau rekaman replay
+# (lihat frame_source.create_source) sehingga pipeline bisa diuji tanpa kamera.
+class CameraCapture:
+    def __init__(self, camera_index, width=1280, height=720, buffer_size=4, reopen_delay=2.0):
+        self.camera_index = camera_index
+        self.width = width
+        self.height = height
+        self.source = create_source(camera_index, width, height)
+        self.reopen_delay = reopen_delay  # Jeda sebelum mencoba membuka ulang kamera
+
+        self.cap = None
+        self._frames = deque(maxlen=buffer_size)  # Isi: (frame_id, timestamp, frame)
+        self._frame_id = 0
+        self._condition = threading.Condition()
+        self._running = False
+        self._thread = None
+
+        # Metrik per kamera
+        labels = {"camera": str(camera_index)}
+        self.read_seconds = metrics.histogram("sibi_camera_read_seconds", "Time spent in cap.read()", labels)
+        self.frames_captured = metrics.counter("sibi_camera_frames_total", "Frames read from the camera", labels)
+        self.read_failures = metrics.counter("sibi_camera_read_failures_total", "Failed cap.read() calls", labels)
+        self.reopens = metrics.counter("sibi_camera_reopen_total", "Camera reopen attempts after a failure", labels)
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="camera-capture", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+        self._release()
+
+    def is_opened(self):
+        cap = self.cap
+        return cap is not None and cap.isOpened()
+
+    def _open(self):
+        try:
+            return self.source.open()
+        except Exception as e:
+            print(f"Error saat membuka sumber frame {self.camera_index}: {e}")
+            return None
+
+    def _release(self):
+        if self.cap is not None:
+            self.cap.release()
+            self.cap = None
+        # Buang frame lama agar konsumer tidak menampilkan frame basi
+        with self._condition:
+            self._frames.clear()
+            self._condition.notify_all()
+
+    def _run(self):
+        first_attempt = True
+        while self._running:
+            # Cek jika objek kamera valid dan terbuka
+            if not self.is_opened():
+                if not first_attempt:
+                    print("Mencoba membuka ulang kamera...")
+                    self.reopens.inc()
+                self._release()
+                self.cap = self._open()
+                if self.cap is None:
+                    if first_attempt:
+                        print(f"PERINGATAN: Tidak dapat membuka kamera {self.camera_index} saat startup.")
+                    else:
+                        print("Masih gagal membuka kamera.")
+                    first_attempt = False
+                    time.sleep(self.reopen_delay)  # Tunggu sebelum mencoba lagi
+                    continue
+                if not first_attempt:
+                    print("Kamera berhasil dibuka ulang.")
+                first_attempt = False
+
+            # Jika kamera OK, baca frame (blocking sesuai FPS kamera)
+            with self.read_seconds.time():
+                success, frame = self.cap.read()
+            if not success:
+                self.read_failures.inc()
+                # Jika gagal baca frame, asumsikan kamera terputus
+                print("Gagal membaca frame, kamera mungkin terputus. Mencoba membuka ulang...")
+                self._release()
+                time.sleep(1)
+                continue
+
+            self.frames_captured.inc()
+            with self._condition:
+                self._frame_id += 1
+                self._frames.append((self._frame_id, time.time(), frame))
+                self._condition.notify_all()
+
+    # Ambil frame terbaru tanpa menunggu: (frame_id, timestamp, frame) atau None
+    def get_latest(self):
+        with self._condition:
+            return self._frames[-1] if self._frames else None
+
+    # Tunggu sampai ada frame yang lebih baru dari last_frame_id.
+    # Mengembalikan None jika timeout (misalnya kamera terputus).
+    def wait_for_frame(self, last_frame_id=0, timeout=1.0):
+        deadline = time.time() + timeout
+        with self._condition:
+            while not self._frames or self._frames[-1][0] <= last_frame_id:
+                remaining = deadline - time.time()
+                if remaining <= 0 or not self._running:
+                    return None
+                self._condition.wait(remaining)
+            return self._frames[-1]
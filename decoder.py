@@ -0,0 +1,121 @@
+import math
+
+# Label yang berarti "tidak ada gestur" (tidak pernah dijadikan kata)
+BLANK_LABELS = {"", "None", "none", "Tidak dikenali", "Model Error", "Prediction Error", "Belum ada prediksi",
+                "Memuat Model"}
+
+
+# --- Decoder Kalimat Streaming ---
+# Mengganti state machine consecutive-count: setiap hasil inferensi (label +
+# distribusi skor) dihaluskan dengan exponential smoothing berbasis waktu,
+# lalu sebuah kata dikeluarkan jika label teratas hasil smoothing:
+#   - skornya >= threshold,
+#   - sudah menjadi label teratas minimal min_frames hasil berturut-turut
+#     dan minimal hold_time detik (stabilitas),
+#   - jarak dari kata sebelumnya >= min_word_gap detik, dan
+#   - bukan pengulangan kata terakhir, kecuali tangan sempat "dilepas"
+#     (skor turun di bawah release_threshold / label berganti) atau
+#     label yang sama ditahan selama repeat_after detik.
+# smoothing (detik) dan hold_time mengatur tradeoff latensi vs stabilitas.
+# Decoder tidak bergantung pada kamera/Flask sehingga bisa diuji dengan
+# urutan skor rekaman (lihat decode_sequence).
+class SentenceDecoder:
+    def __init__(self, threshold=0.5, smoothing=0.15, min_frames=3, hold_time=0.3,
+                 min_word_gap=1.0, release_ratio=0.6, repeat_after=None):
+        self.threshold = threshold  # Skor minimum (setelah smoothing) untuk mengeluarkan kata
+        self.smoothing = smoothing  # Konstanta waktu EMA (detik); 0 = tanpa smoothing
+        self.min_frames = min_frames  # Minimal hasil berturut-turut dengan label teratas yang sama
+        self.hold_time = hold_time  # Minimal durasi (detik) label teratas stabil
+        self.min_word_gap = min_word_gap  # Jeda minimal antar kata (detik)
+        self.release_ratio = release_ratio  # release_threshold = threshold * release_ratio
+        self.repeat_after = repeat_after  # Ulangi kata yang sama jika ditahan selama N detik; None = tidak
+        self.reset()
+
+    def reset(self):
+        self.scores = {}  # label -> skor hasil smoothing
+        self._last_time = None
+        self._candidate = None
+        self._candidate_since = None
+        self._candidate_frames = 0
+        self._last_word = None
+        self._last_word_time = None
+        self._released = True
+
+    def _smooth(self, distribution, timestamp):
+        if self._last_time is None or self.smoothing <= 0:
+            alpha = 1.0
+        else:
+            dt = min(max(timestamp - self._last_time, 0.0), 1.0)
+            alpha = 1.0 - math.exp(-dt / self.smoothing)
+        self._last_time = timestamp
+
+        for label in list(self.scores):
+            self.scores[label] *= (1.0 - alpha)
+            if self.scores[label] < 1e-3:
+                del self.scores[label]
+        for label, score in distribution.items():
+            if label not in BLANK_LABELS:
+                self.scores[label] = self.scores.get(label, 0.0) + alpha * score
+
+    # Masukkan satu hasil inferensi. scores (opsional) = distribusi {label: skor};
+    # jika tidak ada, dipakai {label: score}. Mengembalikan (kata, skor) jika
+    # kata baru dikeluarkan, atau None.
+    def update(self, label, score, timestamp, scores=None):
+        self._smooth(scores if scores is not None else {label: score}, timestamp)
+
+        if self.scores:
+            top_label = max(self.scores, key=self.scores.get)
+            top_score = self.scores[top_label]
+        else:
+            top_label, top_score = None, 0.0
+
+        # Tangan "dilepas": skor turun jauh atau label teratas berganti
+        if top_score < self.threshold * self.release_ratio or top_label != self._last_word:
+            self._released = True
+
+        # Kandidat kata = label teratas yang skornya sudah melewati threshold;
+        # durasi stabil dihitung sejak kandidat ini muncul
+        candidate = top_label if top_score >= self.threshold else None
+        if candidate != self._candidate:
+            self._candidate = candidate
+            self._candidate_since = timestamp
+            self._candidate_frames = 0
+        self._candidate_frames += 1
+
+        if candidate is None:
+            return None
+        if self._candidate_frames < self.min_frames or timestamp - self._candidate_since < self.hold_time:
+            return None
+        if self._last_word_time is not None and timestamp - self._last_word_time < self.min_word_gap:
+            return None
+        if top_label == self._last_word and not self._released:
+            if self.repeat_after is None or timestamp - self._last_word_time < self.repeat_after:
+                return None
+
+        self._last_word = top_label
+        self._last_word_time = timestamp
+        self._released = False
+        return top_label, top_score
+
+    def get_settings(self):
+        return {
+            "threshold": self.threshold,
+            "smoothing": self.smoothing,
+            "min_frames": self.min_frames,
+            "hold_time": self.hold_time,
+            "min_word_gap": self.min_word_gap,
+            "repeat_after": self.repeat_after,
+        }
+
+
+# Decode urutan hasil rekaman [(timestamp, label, score) atau (timestamp, label, score, scores)]
+# menjadi daftar (timestamp, kata, skor); berguna untuk pengujian dan tuning parameter.
+def decode_sequence(results, **decoder_options):
+    decoder = SentenceDecoder(**decoder_options)
+    words = []
+    for item in results:
+        timestamp, label, score = item[:3]
+        emitted = decoder.update(label, score, timestamp, item[3] if len(item) > 3 else None)
+        if emitted is not None:
+            words.append((timestamp, emitted[0], emitted[1]))
+    return words
@@ -0,0 +1,172 @@
+import os
+import sqlite3
+import threading
+import time
+from collections import deque
+from datetime import datetime
+
+
+# --- Penyimpanan Log Deteksi (SQLite, mode WAL) ---
+# Append-only: setiap kata yang ditambahkan ke kalimat disimpan permanen,
+# dengan index per sesi + waktu dan per sesi + gestur agar query tetap cepat
+# walaupun riwayat sudah berminggu-minggu. Index (..., time) melayani query
+# rentang waktu dan index (..., id) melayani kursor id, sehingga urutan dan batas
+# halaman diambil langsung dari index tanpa sort seluruh riwayat.
+class DetectionStore:
+    def __init__(self, path, retention_days=None):
+        self.path = path
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.row_factory = sqlite3.Row
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")  # Aman untuk WAL, jauh lebih cepat dari FULL
+        self._conn.executescript("""
+            CREATE TABLE IF NOT EXISTS detections (
+                id INTEGER PRIMARY KEY AUTOINCREMENT,
+                session_id TEXT NOT NULL,
+                time REAL NOT NULL,
+                gesture TEXT NOT NULL,
+                confidence REAL NOT NULL
+            );
+            CREATE INDEX IF NOT EXISTS idx_detections_session_time ON detections (session_id, time);
+            CREATE INDEX IF NOT EXISTS idx_detections_session_gesture ON detections (session_id, gesture, time);
+            CREATE INDEX IF NOT EXISTS idx_detections_session_id ON detections (session_id, id);
+            CREATE INDEX IF NOT EXISTS idx_detections_session_gesture_id ON detections (session_id, gesture, id);
+        """)
+        self._conn.commit()
+        if retention_days:
+            self.prune(time.time() - retention_days * 86400)
+
+    def insert(self, session_id, timestamp, gesture, confidence):
+        with self._lock:
+            cursor = self._conn.execute(
+                "INSERT INTO detections (session_id, time, gesture, confidence) VALUES (?, ?, ?, ?)",
+                (session_id, timestamp, gesture, confidence))
+            self._conn.commit()
+            return cursor.lastrowid
+
+    # Query berindex. since_id -> entri dengan id lebih besar (urut id naik, untuk fetch inkremental);
+    # selain itu urut terbaru dulu dengan pagination keyset lewat before_id. Kursor selalu
+    # berupa id (urutan penyisipan), sehingga entri dengan jam mundur (misalnya koreksi NTP)
+    # tidak terlewat. Hanya query rentang waktu (start/end) tanpa since_id yang diurutkan
+    # menurut (time, id), karena urutan waktu itulah yang diminta pemanggil.
+    def query(self, session_id, since_id=None, before_id=None, start=None, end=None, gesture=None, limit=50):
+        conditions = ["session_id = ?"]
+        params = [session_id]
+        by_time = since_id is None and (start is not None or end is not None)
+        if since_id is not None:
+            conditions.append("id > ?")
+            params.append(since_id)
+        if before_id is not None:
+            if by_time:
+                with self._lock:
+                    self._add_time_cursor(conditions, params, before_id)
+            else:
+                conditions.append("id < ?")
+                params.append(before_id)
+        # Fetch inkremental: batasi lewat range id, waktu hanya sebagai filter ("+time"
+        # mencegah SQLite memilih index waktu lalu mengurutkan ulang hasilnya)
+        time_column = "time" if since_id is None else "+time"
+        if start is not None:
+            conditions.append(f"{time_column} >= ?")
+            params.append(start)
+        if end is not None:
+            conditions.append(f"{time_column} < ?")
+            params.append(end)
+        if gesture:
+            conditions.append("gesture = ?")
+            params.append(gesture)
+        if by_time:
+            order = "time DESC, id DESC"
+        else:
+            order = "id ASC" if since_id is not None else "id DESC"
+        sql = (f"SELECT id, time, gesture, confidence FROM detections WHERE {' AND '.join(conditions)} "
+               f"ORDER BY {order} LIMIT ?")
+        params.append(limit)
+        with self._lock:
+            rows = self._conn.execute(sql, params).fetchall()
+        return [_row_to_entry(row["id"], row["time"], row["gesture"], row["confidence"]) for row in rows]
+
+    # before_id pada query rentang waktu -> kondisi keyset (time, id) sesuai urutan halaman.
+    # Jika entri kursor tidak ada lagi (sudah di-prune), cukup filter berdasarkan id.
+    def _add_time_cursor(self, conditions, params, cursor_id):
+        row = self._conn.execute("SELECT time FROM detections WHERE id = ?", (cursor_id,)).fetchone()
+        if row is None:
+            conditions.append("id < ?")
+            params.append(cursor_id)
+        else:
+            conditions.append("(time, id) < (?, ?)")
+            params.extend((row["time"], cursor_id))
+
+    def prune(self, older_than):
+        with self._lock:
+            self._conn.execute("DELETE FROM detections WHERE time < ?", (older_than,))
+            self._conn.commit()
+
+    def close(self):
+        with self._lock:
+            self._conn.close()
+
+
+def _row_to_entry(entry_id, timestamp, gesture, confidence):
+    return {
+        "id": entry_id,
+        "timestamp": datetime.fromtimestamp(timestamp).strftime('%H:%M:%S'), # Format Waktu
+        "time": timestamp,
+        "gesture": gesture,
+        "confidence": round(confidence, 2),
+    }
+
+
+# --- Log Deteksi per Sesi ---
+# Ring buffer di memori (deque dengan maxlen, O(1)) untuk /get_log biasa,
+# ditambah penyimpanan permanen opsional di DetectionStore.
+class DetectionLog:
+    def __init__(self, session_id, store=None, max_size=50):
+        self.session_id = session_id
+        self.store = store
+        self._entries = deque(maxlen=max_size)
+        self._lock = threading.Lock()
+        self._next_id = 1  # Dipakai jika tidak ada store
+        if store is not None:
+            # Muat riwayat terakhir agar log tidak hilang setelah restart
+            self._entries.extend(reversed(store.query(session_id, limit=max_size)))
+
+    def append(self, gesture, confidence, timestamp=None):
+        timestamp = timestamp if timestamp is not None else time.time()
+        with self._lock:
+            if self.store is not None:
+                entry_id = self.store.insert(self.session_id, timestamp, gesture, confidence)
+            else:
+                entry_id = self._next_id
+                self._next_id += 1
+            entry = _row_to_entry(entry_id, timestamp, gesture, confidence)
+            self._entries.append(entry)
+        return entry
+
+    # Entri terbaru di memori, terbaru di atas
+    def recent(self, limit=None):
+        with self._lock:
+            entries = list(reversed(self._entries))
+        return entries[:limit] if limit else entries
+
+    def query(self, since_id=None, before_id=None, start=None, end=None, gesture=None, limit=50):
+        if self.store is not None:
+            return self.store.query(self.session_id, since_id=since_id, before_id=before_id,
+                                    start=start, end=end, gesture=gesture, limit=limit)
+        # Tanpa store: filter dari ring buffer di memori
+        entries = self.recent()
+        if since_id is not None:
+            entries = [e for e in reversed(entries) if e["id"] > since_id]
+        if before_id is not None:
+            entries = [e for e in entries if e["id"] < before_id]
+        if start is not None:
+            entries = [e for e in entries if e["time"] >= start]
+        if end is not None:
+            entries = [e for e in entries if e["time"] < end]
+        if gesture:
+            entries = [e for e in entries if e["gesture"] == gesture]
+        return entries[:limit]
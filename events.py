@@ -0,0 +1,99 @@
+import json
+import queue
+import threading
+
+_CLOSED = object()  # Penanda di antrian klien bahwa broadcaster ditutup
+
+
+# --- Broadcaster Event untuk Server-Sent Events (SSE) ---
+# Setiap klien mendapat antrian sendiri. publish() tidak pernah memblokir:
+# jika antrian klien penuh (klien lambat), event terlama dibuang.
+class EventBroadcaster:
+    def __init__(self, max_queue_size=100, max_subscribers=None):
+        self.max_queue_size = max_queue_size
+        self.max_subscribers = max_subscribers  # Batas klien bersamaan; None = tanpa batas
+        self._subscribers = set()
+        self._lock = threading.Lock()
+        self._closed = False
+
+    # Antrian baru untuk satu klien, atau None jika batas klien sudah tercapai
+    # atau broadcaster sudah ditutup
+    def subscribe(self):
+        q = queue.Queue(maxsize=self.max_queue_size)
+        with self._lock:
+            if self._closed:
+                return None
+            if self.max_subscribers is not None and len(self._subscribers) >= self.max_subscribers:
+                return None
+            self._subscribers.add(q)
+        return q
+
+    def unsubscribe(self, q):
+        with self._lock:
+            self._subscribers.discard(q)
+
+    def subscriber_count(self):
+        with self._lock:
+            return len(self._subscribers)
+
+    def publish(self, event, data):
+        message = format_sse(event, data)
+        with self._lock:
+            subscribers = list(self._subscribers)
+        for q in subscribers:
+            _put_latest(q, message)
+
+    # Akhiri semua stream (misalnya sesi dihapus); klien menerima akhir respons
+    # alih-alih heartbeat selamanya
+    def close(self):
+        with self._lock:
+            self._closed = True
+            subscribers = list(self._subscribers)
+        for q in subscribers:
+            _put_latest(q, _CLOSED)
+
+    # Generator pesan SSE untuk satu klien; initial_events dikirim lebih dulu
+    # (snapshot state saat ini), lalu komentar heartbeat jika tidak ada event.
+    # q = antrian dari subscribe() (agar batas klien bisa dicek sebelum respons dimulai);
+    # jika None, klien didaftarkan di sini.
+    def stream(self, initial_events=(), heartbeat_interval=15.0, q=None):
+        if q is None:
+            q = self.subscribe()
+            if q is None:
+                return
+        try:
+            for event, data in initial_events:
+                yield format_sse(event, data)
+            while not self._closed:
+                try:
+                    message = q.get(timeout=heartbeat_interval)
+                except queue.Empty:
+                    yield ": heartbeat\n\n"
+                    continue
+                if message is _CLOSED:
+                    return
+                yield message
+        finally:
+            # Dipanggil saat klien memutus koneksi (generator ditutup)
+            self.unsubscribe(q)
+
+
+# Masukkan pesan tanpa memblokir; jika antrian penuh (klien lambat), event terlama
+# dibuang agar klien tetap menerima update terbaru
+def _put_latest(q, message):
+    try:
+        q.put_nowait(message)
+    except queue.Full:
+        try:
+            q.get_nowait()
+        except queue.Empty:
+            pass
+        try:
+            q.put_nowait(message)
+        except queue.Full:
+            pass
+
+
+# Format satu event sesuai spesifikasi text/event-stream
+def format_sse(event, data):
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
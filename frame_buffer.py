@@ -0,0 +1,31 @@
+import cv2
+import numpy as np
+
+
+# --- Buffer Frame yang Dipakai Ulang ---
+# Satu blok memori yang tumbuh sesuai kebutuhan; get(shape) mengembalikan view
+# contiguous dengan ukuran tersebut tanpa alokasi baru. Ukuran berbeda-beda
+# (misalnya crop ROI) tetap memakai blok yang sama.
+# Tidak thread-safe: setiap pemilik (engine, encoder) punya buffer sendiri dan
+# hasilnya hanya valid sampai get() berikutnya.
+class FrameBuffer:
+    def __init__(self):
+        self._memory = np.empty(0, dtype=np.uint8)
+
+    def get(self, shape):
+        size = int(np.prod(shape))
+        if self._memory.size < size:
+            self._memory = np.empty(size, dtype=np.uint8)
+        return self._memory[:size].reshape(shape)
+
+
+# BGR -> RGB (opsional sekaligus flip horizontal) ke dalam buffer, tanpa alokasi.
+# Sumber tidak diubah sehingga aman untuk frame bersama dari CameraCapture.
+def to_rgb(image, buffer, mirror=False):
+    out = buffer.get(image.shape)
+    if mirror:
+        cv2.flip(image, 1, dst=out)
+        cv2.cvtColor(out, cv2.COLOR_BGR2RGB, dst=out)  # In-place
+    else:
+        cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=out)
+    return out
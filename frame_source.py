@@ -0,0 +1,235 @@
+import os
+import struct
+import time
+from urllib.parse import parse_qs
+
+import cv2
+import numpy as np
+
+
+# --- Sumber Frame yang Bisa Diganti ---
+# CameraCapture tidak lagi membuat cv2.VideoCapture sendiri, tetapi memanggil
+# source.open() yang mengembalikan objek mirip VideoCapture (isOpened/read/set/release),
+# atau None jika sumber belum tersedia. Spesifikasi sumber (lihat create_source):
+#   1, "1"                                  -> webcam (index OpenCV)
+#   "recordings/a.mp4", "rtsp://..."        -> file video / stream via OpenCV
+#   "recordings/a.sibirec"                  -> replay rekaman, kecepatan asli, berulang
+#   "replay:recordings/a.sibirec?speed=max&loop=1&disconnect_every=300&disconnect_duration=2"
+#                                           -> replay dengan opsi (speed: faktor atau "max")
+RECORDING_EXTENSION = ".sibirec"
+REPLAY_PREFIX = "replay:"
+
+
+class OpenCVSource:
+    def __init__(self, device, width=None, height=None, exclusive=True):
+        self.device = device
+        self.width = width
+        self.height = height
+        self.exclusive = exclusive  # True = device fisik, tidak boleh dipakai dua sesi sekaligus
+
+    def open(self):
+        cap = cv2.VideoCapture(self.device)
+        if not cap.isOpened():
+            cap.release()
+            return None
+        # Coba mengatur resolusi kamera (misalnya 16:9, 1280x720)
+        if self.width:
+            cap.set(cv2.CAP_PROP_FRAME_WIDTH, self.width)
+        if self.height:
+            cap.set(cv2.CAP_PROP_FRAME_HEIGHT, self.height)
+        return cap
+
+
+# --- Format Rekaman (.sibirec) ---
+# Header MAGIC, lalu record berurutan (append-only, bisa dibaca secara streaming):
+#   <f8 timestamp> <u4 panjang JPEG> <u2 jumlah tangan> <JPEG> <float32 landmark (tangan, 21, 3)>
+# Frame disimpan sebagai JPEG sehingga rekaman jauh lebih kecil dari frame mentah.
+MAGIC = b"SIBIREC1"
+_RECORD_HEADER = struct.Struct("<dIH")
+_LANDMARK_VALUES = 21 * 3
+
+
+class FrameRecorder:
+    def __init__(self, path, jpeg_quality=90):
+        directory = os.path.dirname(path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self.path = path
+        self.jpeg_quality = jpeg_quality
+        self.frames_written = 0
+        self._file = open(path, "wb")
+        self._file.write(MAGIC)
+
+    # landmarks (opsional): array (tangan, 21, 3), misalnya lmlist dari HandDetector.findHandsArray
+    def write(self, frame, timestamp=None, landmarks=None):
+        ok, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, self.jpeg_quality])
+        if not ok:
+            raise ValueError("Gagal meng-encode frame ke JPEG")
+        landmarks = np.zeros((0, 21, 3), np.float32) if landmarks is None else np.asarray(landmarks, np.float32)
+        self._file.write(_RECORD_HEADER.pack(time.time() if timestamp is None else timestamp,
+                                             len(buffer), len(landmarks)))
+        self._file.write(buffer.tobytes())
+        self._file.write(landmarks.tobytes())
+        self.frames_written += 1
+
+    def close(self):
+        self._file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def _read_record(file):
+    header = file.read(_RECORD_HEADER.size)
+    if len(header) < _RECORD_HEADER.size:
+        return None  # Akhir file (atau record terakhir terpotong)
+    timestamp, jpeg_size, hands = _RECORD_HEADER.unpack(header)
+    jpeg = file.read(jpeg_size)
+    landmark_bytes = file.read(hands * _LANDMARK_VALUES * 4)
+    if len(jpeg) < jpeg_size or len(landmark_bytes) < hands * _LANDMARK_VALUES * 4:
+        return None
+    landmarks = np.frombuffer(landmark_bytes, np.float32).reshape(hands, 21, 3) if hands else None
+    return timestamp, jpeg, landmarks
+
+
+def _open_recording(path):
+    file = open(path, "rb")
+    if file.read(len(MAGIC)) != MAGIC:
+        file.close()
+        raise ValueError(f"'{path}' bukan file rekaman {RECORDING_EXTENSION}")
+    return file
+
+
+# Baca rekaman tanpa men-decode JPEG: yield (timestamp, jpeg_bytes, landmarks atau None)
+def iter_recording(path):
+    file = _open_recording(path)
+    try:
+        while True:
+            record = _read_record(file)
+            if record is None:
+                break
+            yield record
+    finally:
+        file.close()
+
+
+# --- Replay Rekaman sebagai Kamera Virtual ---
+# speed: 1.0 = kecepatan asli (sesuai timestamp rekaman), 2.0 = dua kali lebih cepat,
+# 0/None = secepat mungkin. disconnect_every: setelah N frame, read() gagal dan sumber
+# "tidak tersedia" selama disconnect_duration detik, untuk menguji logika buka ulang kamera.
+# Posisi replay disimpan di source sehingga pemutaran berlanjut setelah tersambung kembali.
+class ReplaySource:
+    exclusive = False
+
+    def __init__(self, path, speed=1.0, loop=True, disconnect_every=None, disconnect_duration=2.0):
+        self.path = path
+        self.speed = speed
+        self.loop = loop
+        self.disconnect_every = disconnect_every
+        self.disconnect_duration = disconnect_duration
+        self.position = len(MAGIC)  # Offset record berikutnya di file
+        self.finished = False
+        self._unavailable_until = 0.0
+
+    def open(self):
+        if self.finished or time.time() < self._unavailable_until or not os.path.isfile(self.path):
+            return None
+        return ReplayCapture(self)
+
+    def disconnect(self):
+        self._unavailable_until = time.time() + self.disconnect_duration
+
+
+class ReplayCapture:
+    def __init__(self, source):
+        self.source = source
+        self.last_landmarks = None  # Landmark rekaman untuk frame terakhir yang dibaca (jika ada)
+        self._file = _open_recording(source.path)
+        self._file.seek(source.position)
+        self._frames_read = 0
+        self._clock = None  # (waktu dinding, timestamp rekaman) acuan untuk pacing
+
+    def isOpened(self):
+        return self._file is not None
+
+    def set(self, prop, value):
+        return False  # Resolusi mengikuti rekaman
+
+    def _next_record(self):
+        record = _read_record(self._file)
+        if record is None and self.source.loop:
+            self._file.seek(len(MAGIC))
+            self._clock = None
+            record = _read_record(self._file)
+        return record
+
+    def read(self):
+        if self._file is None:
+            return False, None
+        source = self.source
+        if source.disconnect_every and self._frames_read >= source.disconnect_every:
+            source.disconnect()  # Simulasi kamera terputus
+            return False, None
+
+        record = self._next_record()
+        if record is None:
+            source.finished = True  # Rekaman habis (tanpa loop)
+            return False, None
+        source.position = self._file.tell()
+        timestamp, jpeg, self.last_landmarks = record
+
+        # Pacing sesuai timestamp rekaman
+        if source.speed:
+            now = time.perf_counter()
+            if self._clock is None:
+                self._clock = (now, timestamp)
+            delay = self._clock[0] + (timestamp - self._clock[1]) / source.speed - now
+            if delay > 0:
+                time.sleep(delay)
+            elif delay < -1.0:
+                self._clock = (now, timestamp)  # Tertinggal jauh (misalnya setelah disconnect): mulai ulang acuan
+
+        frame = cv2.imdecode(np.frombuffer(jpeg, np.uint8), cv2.IMREAD_COLOR)
+        self._frames_read += 1
+        return frame is not None, frame
+
+    def release(self):
+        if self._file is not None:
+            self._file.close()
+            self._file = None
+
+
+def _parse_replay(spec):
+    path, _, query = spec[len(REPLAY_PREFIX):].partition("?")
+    options = {key: values[-1] for key, values in parse_qs(query).items()}
+    speed = options.get("speed", "1")
+    disconnect_every = options.get("disconnect_every")
+    return ReplaySource(
+        path,
+        speed=0.0 if speed == "max" else float(speed),
+        loop=options.get("loop", "1").lower() not in ("0", "false", "no"),
+        disconnect_every=int(disconnect_every) if disconnect_every else None,
+        disconnect_duration=float(options.get("disconnect_duration", 2.0)),
+    )
+
+
+# Buat sumber frame dari spesifikasi (lihat komentar di atas); objek yang sudah
+# punya method open() dikembalikan apa adanya.
+def create_source(spec, width=None, height=None):
+    if hasattr(spec, "open"):
+        return spec
+    if isinstance(spec, int) or (isinstance(spec, str) and spec.isdigit()):
+        return OpenCVSource(int(spec), width, height)
+    if spec.startswith(REPLAY_PREFIX):
+        return _parse_replay(spec)
+    if spec.endswith(RECORDING_EXTENSION):
+        return ReplaySource(spec)
+    return OpenCVSource(spec, exclusive=False)
+
+
+# True jika spesifikasi menunjuk device fisik yang hanya bisa dibuka satu sesi
+def is_exclusive(spec):
+    return getattr(create_source(spec), "exclusive", False)
@@ -0,0 +1,277 @@
+import threading
+import time
+
+import cv2
+import numpy as np
+
+import metrics
+from frame_buffer import FrameBuffer, to_rgb
+
+COLOR_CONVERT_SECONDS = metrics.histogram("sibi_color_convert_seconds",
+                                          "Time spent converting BGR->RGB (including the mirror flip)")
+RECOGNIZE_SECONDS = metrics.histogram("sibi_recognize_seconds", "Time spent in GestureRecognizer.recognize()")
+
+
+# Buat GestureRecognizer (mode IMAGE) dari file model .task
+def create_recognizer(model_path):
+    # Import mediapipe ditunda sampai model benar-benar dimuat (startup server lebih cepat)
+    import mediapipe as mp
+    base_options = mp.tasks.BaseOptions(model_asset_path=model_path)
+    options = mp.tasks.vision.GestureRecognizerOptions(base_options=base_options)
+    return mp.tasks.vision.GestureRecognizer.create_from_options(options)
+
+# Jalankan recognizer pada satu gambar BGR (frame penuh, frame diperkecil, atau crop ROI)
+# Mengembalikan (gesture, confidence, landmarks) dengan landmarks ternormalisasi (21, 2)
+# mirror=True: dikenali seolah gambar di-flip horizontal; flip digabung dengan konversi
+# warna ke buffer (FrameBuffer) yang dipakai ulang, jadi tidak ada salinan frame tambahan
+def run_recognizer(recognizer, image, mirror=False, buffer=None):
+    import mediapipe as mp # Sudah ada di sys.modules setelah create_recognizer, jadi murah
+    with COLOR_CONVERT_SECONDS.time():
+        # Hasilnya array contiguous, juga untuk crop ROI
+        image_rgb = to_rgb(image, buffer if buffer is not None else FrameBuffer(), mirror)
+    mp_image = mp.Image(image_format=mp.ImageFormat.SRGB, data=image_rgb)
+    with RECOGNIZE_SECONDS.time():
+        recognition_result = recognizer.recognize(mp_image)
+
+    landmarks = None
+    if recognition_result.hand_landmarks:
+        landmarks = np.array([[lm.x, lm.y] for lm in recognition_result.hand_landmarks[0]], dtype=np.float32)
+    if recognition_result.gestures:
+        # Asumsi gestur teratas adalah yang paling relevan
+        top_gesture = recognition_result.gestures[0][0]
+        # Distribusi skor semua kategori tangan tersebut untuk decoder kalimat
+        scores = {category.category_name: category.score for category in recognition_result.gestures[0]}
+        # Kembalikan hasil mentah, thresholding dilakukan oleh pemanggil
+        return top_gesture.category_name, top_gesture.score, landmarks, scores
+    # Jika tidak ada gestur terdeteksi oleh model
+    return "Tidak dikenali", 0.0, landmarks, None
+
+# --- Engine Pengenalan ---
+# Engine = objek dengan recognize(image, mirror=False) -> (gesture, confidence, landmarks, scores) dan close().
+# scores = distribusi {label: skor} untuk SentenceDecoder, atau None jika tidak ada gestur.
+# mirror=True: hasil (termasuk landmark) seolah gambar di-flip horizontal, tanpa flip oleh pemanggil.
+# Engine tidak thread-safe (dipakai eksklusif lewat RecognizerPool), jadi boleh memakai buffer sendiri.
+# "gesture_recognizer": pipeline penuh MediaPipe GestureRecognizer (.task)
+# "landmark": landmark MediaPipe Hands + classifier NumPy ringan (.npz), lihat landmark_classifier.py
+ENGINES = ("gesture_recognizer", "landmark")
+
+class GestureRecognizerEngine:
+    def __init__(self, model_path):
+        self.recognizer = create_recognizer(model_path)
+        self.buffer = FrameBuffer()  # Buffer RGB yang dipakai ulang untuk setiap frame
+
+    def recognize(self, image, mirror=False):
+        return run_recognizer(self.recognizer, image, mirror, self.buffer)
+
+    def close(self):
+        self.recognizer.close()
+
+# Jalankan beberapa inferensi dummy agar inisialisasi lazy (alokasi buffer,
+# persiapan graph) terjadi sebelum engine melayani user pertama
+def warm_up(engine, frames=2, width=1280, height=720):
+    sizes = [(width, height), (width // 2, height // 2)]  # Frame penuh & ukuran deteksi/ROI
+    for i in range(frames):
+        w, h = sizes[i % len(sizes)]
+        engine.recognize(np.zeros((h, w, 3), dtype=np.uint8))
+
+def create_engine(engine, model_path):
+    if engine == "gesture_recognizer":
+        return GestureRecognizerEngine(model_path)
+    if engine == "landmark":
+        from landmark_classifier import LandmarkEngine
+        return LandmarkEngine(model_path)
+    raise ValueError(f"Engine tidak dikenal: {engine}")
+
+
+# --- Worker Inferensi Latar Belakang ---
+# Loop inferensi yang terus berjalan: mengambil frame terbaru dari CameraCapture,
+# menjalankan predict_fn(frame) -> (gesture, confidence, scores), lalu menyimpan hasil
+# terakhir. Endpoint HTTP cukup membaca hasil yang sudah di-cache.
+class InferenceWorker:
+    def __init__(self, camera, predict_fn, on_result=None, fps_smoothing=0.9, labels=None):
+        self.camera = camera
+        self.predict_fn = predict_fn
+        self.on_result = on_result  # Callback opsional: on_result(gesture, confidence, timestamp, scores)
+        self.fps_smoothing = fps_smoothing  # Faktor EMA untuk perhitungan FPS inferensi
+
+        self._lock = threading.Lock()
+        self._result = None
+        self._fps = 0.0
+        self._last_inference_end = None
+        self._running = False
+        self._thread = None
+
+        self.inference_seconds = metrics.histogram("sibi_inference_seconds", "Total per-frame prediction time in the worker",
+                                                   labels)
+        self.frames_processed = metrics.counter("sibi_inference_frames_total", "Frames processed by the inference worker",
+                                                labels)
+        self.frames_dropped = metrics.counter("sibi_inference_frames_dropped_total",
+                                              "Captured frames never seen by the inference worker", labels)
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="inference-worker", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+
+    def _run(self):
+        last_frame_id = 0
+        while self._running:
+            # Tunggu frame baru; frame yang sama tidak diproses dua kali
+            latest = self.camera.wait_for_frame(last_frame_id, timeout=1.0)
+            if latest is None:
+                continue
+            if last_frame_id and latest[0] > last_frame_id + 1:
+                self.frames_dropped.inc(latest[0] - last_frame_id - 1)
+            last_frame_id, frame_time, frame = latest
+
+            start = time.time()
+            try:
+                gesture, confidence, scores = self.predict_fn(frame)
+            except Exception as e:
+                print(f"Error di worker inferensi: {e}")
+                gesture, confidence, scores = "Prediction Error", 0.0, None
+            end = time.time()
+            self.inference_seconds.observe(end - start)
+            self.frames_processed.inc()
+
+            with self._lock:
+                # Hitung FPS inferensi dengan exponential moving average
+                if self._last_inference_end is not None:
+                    interval = end - self._last_inference_end
+                    if interval > 0:
+                        instant_fps = 1.0 / interval
+                        if self._fps == 0.0:
+                            self._fps = instant_fps
+                        else:
+                            self._fps = self.fps_smoothing * self._fps + (1 - self.fps_smoothing) * instant_fps
+                self._last_inference_end = end
+                self._result = {
+                    "gesture": gesture,
+                    "confidence": confidence,
+                    "frame_id": last_frame_id,
+                    "frame_timestamp": frame_time,
+                    "timestamp": end,
+                    "inference_time": end - start,
+                }
+
+            if self.on_result is not None:
+                try:
+                    self.on_result(gesture, confidence, end, scores)
+                except Exception as e:
+                    print(f"Error di callback hasil inferensi: {e}")
+
+    # Ambil salinan hasil terakhir beserta statistiknya, atau None jika belum ada
+    def get_result(self):
+        with self._lock:
+            if self._result is None:
+                return None
+            result = dict(self._result)
+            result["fps"] = self._fps
+        result["age"] = time.time() - result["frame_timestamp"]
+        return result
+
+
+# --- Inferensi Berbasis ROI Tangan ---
+# Mengurangi beban CPU per frame:
+# 1. Mode deteksi: frame diperkecil ke detection_width sebelum dikenali.
+# 2. Mode tracking: frame berikutnya di-crop ke bounding box tangan terakhir
+#    (diperluas dengan roi_margin) dari frame resolusi penuh.
+# 3. Jika landmark hampir tidak bergerak, hingga max_skip frame berikutnya
+#    memakai hasil sebelumnya tanpa menjalankan model.
+# recognize_fn(image, mirror) -> (gesture, confidence, landmarks) dengan landmarks berupa
+# array (21, 2) koordinat ternormalisasi terhadap image, atau None jika tidak ada tangan.
+# Dengan mirror=True semua koordinat (ROI, landmark) berada di ruang frame yang di-flip,
+# tetapi frame tidak pernah di-flip utuh: ROI di-crop dari frame asli pada posisi
+# cerminnya dan engine yang mem-flip crop/frame kecil tersebut.
+class RoiTracker:
+    def __init__(self, detection_width=640, roi_margin=0.5, min_roi_size=128,
+                 static_threshold=0.02, max_skip=2, redetect_interval=30):
+        self.detection_width = detection_width
+        self.roi_margin = roi_margin  # Perluasan bbox relatif terhadap sisi terpanjang tangan
+        self.min_roi_size = min_roi_size  # Ukuran minimum ROI dalam piksel
+        self.static_threshold = static_threshold  # Rata-rata pergeseran landmark relatif ukuran tangan
+        self.max_skip = max_skip  # Maksimal frame berturut-turut yang dilewati saat tangan diam
+        self.redetect_interval = redetect_interval  # Paksa deteksi ulang frame penuh tiap N inferensi
+
+        self._lock = threading.RLock()
+        self._resize_buffer = FrameBuffer()  # Output resize mode deteksi (dipakai di dalam lock)
+        self.stats = {"detect": 0, "roi": 0, "skipped": 0}
+        self.reset()
+
+    def reset(self):
+        with self._lock:
+            self._roi = None  # (x0, y0, x1, y1) dalam piksel frame penuh
+            self._last_points = None
+            self._last_result = None
+            self._skip_remaining = 0
+            self._since_detect = 0
+
+    def _roi_from_points(self, points, frame_w, frame_h):
+        x_min, y_min = points.min(axis=0)
+        x_max, y_max = points.max(axis=0)
+        # ROI persegi di sekitar tangan agar proporsi tangan tidak terdistorsi
+        size = max(x_max - x_min, y_max - y_min) * (1 + 2 * self.roi_margin)
+        size = min(max(size, self.min_roi_size), frame_w, frame_h)
+        cx, cy = (x_min + x_max) / 2, (y_min + y_max) / 2
+        x0 = int(np.clip(cx - size / 2, 0, frame_w - size))
+        y0 = int(np.clip(cy - size / 2, 0, frame_h - size))
+        return x0, y0, x0 + int(size), y0 + int(size)
+
+    def run(self, frame, recognize_fn, mirror=False):
+        with self._lock:
+            # Tangan diam: pakai hasil sebelumnya tanpa inferensi
+            if self._last_result is not None and self._skip_remaining > 0:
+                self._skip_remaining -= 1
+                self.stats["skipped"] += 1
+                return self._last_result
+
+            frame_h, frame_w = frame.shape[:2]
+            if self._roi is None or self._since_detect >= self.redetect_interval:
+                # Mode deteksi pada frame yang diperkecil
+                x0, y0, region_w, region_h = 0, 0, frame_w, frame_h
+                if self.detection_width and frame_w > self.detection_width:
+                    scale = self.detection_width / frame_w
+                    size = (self.detection_width, int(round(frame_h * scale)))
+                    image = cv2.resize(frame, size, dst=self._resize_buffer.get((size[1], size[0], 3)),
+                                       interpolation=cv2.INTER_AREA)
+                else:
+                    image = frame
+                self._since_detect = 0
+                self.stats["detect"] += 1
+            else:
+                # Mode tracking: crop ke ROI tangan dari frame resolusi penuh
+                x0, y0, x1, y1 = self._roi
+                if mirror:
+                    image = frame[y0:y1, frame_w - x1:frame_w - x0] # Crop cermin; di-flip oleh engine
+                else:
+                    image = frame[y0:y1, x0:x1]
+                region_w, region_h = x1 - x0, y1 - y0
+                self._since_detect += 1
+                self.stats["roi"] += 1
+
+            gesture, confidence, landmarks, scores = recognize_fn(image, mirror)
+
+            if landmarks is None:
+                # Tangan hilang: kembali ke mode deteksi pada frame berikutnya
+                self.reset()
+            else:
+                # Petakan landmark kembali ke koordinat piksel frame penuh
+                points = np.asarray(landmarks, dtype=np.float32)[:, :2] * (region_w, region_h) + (x0, y0)
+                if self._last_points is not None:
+                    hand_size = max(np.ptp(points[:, 0]), np.ptp(points[:, 1]), 1.0)
+                    motion = np.linalg.norm(points - self._last_points, axis=1).mean() / hand_size
+                    if motion < self.static_threshold:
+                        self._skip_remaining = self.max_skip
+                self._last_points = points
+                self._roi = self._roi_from_points(points, frame_w, frame_h)
+
+            self._last_result = (gesture, confidence, scores)
+            return self._last_result
@@ -0,0 +1,91 @@
+import numpy as np
+
+from main import HandDetector
+
+
+# --- Normalisasi Landmark ---
+# (hands, 21, 3) -> (hands, 63): relatif terhadap pergelangan (landmark 0) lalu
+# diskalakan dengan jarak terjauh dari pergelangan, sehingga fitur tidak
+# bergantung pada posisi dan ukuran tangan di frame.
+# PENTING: harus sama persis dengan normalisasi di notebook training.
+def normalize_landmarks(landmarks):
+    landmarks = np.asarray(landmarks, dtype=np.float32)
+    if landmarks.ndim == 2:
+        landmarks = landmarks[None]
+    relative = landmarks - landmarks[:, :1, :]
+    scale = np.linalg.norm(relative[:, :, :2], axis=2).max(axis=1)
+    scale[scale == 0] = 1.0
+    return (relative / scale[:, None, None]).reshape(len(landmarks), -1)
+
+
+# --- Classifier Head NumPy ---
+# MLP kecil (Dense + ReLU, softmax di akhir) yang diekspor dari notebook training
+# ke file .npz berisi: labels, W0, b0, W1, b1, ... (urutan layer).
+class LandmarkClassifier:
+    def __init__(self, model_path):
+        data = np.load(model_path, allow_pickle=False)
+        self.labels = [str(label) for label in data["labels"]]
+        self.layers = []
+        i = 0
+        while f"W{i}" in data:
+            self.layers.append((data[f"W{i}"].astype(np.float32), data[f"b{i}"].astype(np.float32)))
+            i += 1
+        if not self.layers:
+            raise ValueError(f"File {model_path} tidak berisi bobot layer (W0, b0, ...)")
+        if self.layers[-1][0].shape[1] != len(self.labels):
+            raise ValueError("Jumlah label tidak sesuai dengan output layer terakhir")
+
+    # features (n, 63) -> probabilitas (n, jumlah label); semua tangan dalam satu panggilan
+    def predict_proba(self, features):
+        x = np.asarray(features, dtype=np.float32)
+        for index, (weights, bias) in enumerate(self.layers):
+            x = x @ weights + bias
+            if index < len(self.layers) - 1:
+                np.maximum(x, 0, out=x)
+        x -= x.max(axis=1, keepdims=True)
+        np.exp(x, out=x)
+        x /= x.sum(axis=1, keepdims=True)
+        return x
+
+    # landmarks (hands, 21, 3) -> [(label, score), ...] per tangan
+    def classify(self, landmarks):
+        if len(landmarks) == 0:
+            return []
+        probs = self.predict_proba(normalize_landmarks(landmarks))
+        best = probs.argmax(axis=1)
+        return [(self.labels[i], float(probs[row, i])) for row, i in enumerate(best)]
+
+
+# --- Engine Pengenalan Berbasis Landmark ---
+# Alternatif GestureRecognizer: landmark dari HandDetector (MediaPipe Hands)
+# lalu diklasifikasikan oleh LandmarkClassifier, tanpa embedding model gestur.
+# recognize() mengikuti format run_recognizer: (gesture, confidence, landmarks (21, 2) ternormalisasi, scores)
+# Mode cermin ditangani pada koordinat landmark (x -> w - x), bukan dengan mem-flip piksel.
+class LandmarkEngine:
+    def __init__(self, classifier_path, max_hands=2, detection_confidence=0.5):
+        self.classifier = LandmarkClassifier(classifier_path)
+        # static_image_mode agar engine bisa dipakai bergantian oleh beberapa sesi
+        self.detector = HandDetector(mode=True, maxHands=max_hands, detectionCon=detection_confidence)
+
+    def recognize(self, image, mirror=False):
+        hands = self.detector.findHandsArray(image)
+        if len(hands["lmlist"]) == 0:
+            # Jika tidak ada tangan terdeteksi
+            return "Tidak dikenali", 0.0, None, None
+
+        h, w = image.shape[:2]
+        lmlist = hands["lmlist"]
+        if mirror:
+            lmlist[:, :, 0] = w - lmlist[:, :, 0]
+        probs = self.classifier.predict_proba(normalize_landmarks(lmlist))
+        # Ambil tangan dengan skor tertinggi sebagai gestur utama
+        best = int(probs.max(axis=1).argmax())
+        top = int(probs[best].argmax())
+        gesture, confidence = self.classifier.labels[top], float(probs[best, top])
+        # Distribusi lengkap tangan tersebut untuk decoder kalimat
+        scores = dict(zip(self.classifier.labels, probs[best].tolist()))
+        landmarks = lmlist[best, :, :2].astype(np.float32) / (w, h)
+        return gesture, confidence, landmarks, scores
+
+    def close(self):
+        self.detector.hands.close()
@@ -1,6 +1,10 @@
 import cv2
 import mediapipe as mp
 import math
+import numpy as np
+import sys
+
+from frame_source import create_source
 
 class HandDetector:
     def __init__(self, mode=False, maxHands=2, detectionCon=0.5, minTrackCon=0.5):
@@ -18,56 +22,76 @@ class HandDetector:
         self.fingerTips = []
         self.lmList = []
 
-    def findHands(self, img, draw=True, flipType=True):
+    def findHandsArray(self, img, flipType=True):
+        ## Fast path: semua tangan sebagai array NumPy contiguous
+        ## lmlist (hands, 21, 3), bbox (hands, 4), center (hands, 2), fingers (hands, 5)
         imgRGB = cv2.cvtColor(img, cv2.COLOR_BGR2RGB)
         self.results = self.hands.process(imgRGB)
-        all_hands = []
         h, w, c = img.shape
 
-        if self.results.multi_hand_landmarks:
-            for handType, handLms in zip(self.results.multi_handedness, self.results.multi_hand_landmarks):
-                myhand = {}
-                ##lmlist = []
-                mylmList = []
-                xList = []
-                yList = []
-                for id, lm in enumerate(handLms.landmark):
-                    px, py, pz = int(lm.x * w), int(lm.y * h), int(lm.z * w)
-                    mylmList.append([px, py, pz])
-                    xList.append(px)
-                    yList.append(py)
-
-                ## Bounding Box
-                xmin, xmax = min(xList), max(xList)
-                ymin, ymax = min(yList), max(yList)
-                boxW, boxH = xmax - xmin, ymax - ymin
-                bbox = xmin, ymin, boxW, boxH
-                cx, cy = bbox[0] + (bbox[2] // 2), \
-                         bbox[1] + (bbox[3] // 2)
-                
-                myhand['lmlist'] = mylmList
-                myhand['bbox'] = bbox
-                myhand['center'] = (cx, cy)
-
-                if flipType:
-                    if handType.classification[0].label == 'Right':
-                        myhand['type'] = 'Kiri'
-                    else:
-                        myhand['type'] = 'Kanan'
-                else:
-                    myhand['type'] = handType.classification[0].label
-                all_hands.append(myhand)
-
-                ## Draw Bounding Box
-                if draw:
-                    self.mpDraw.draw_landmarks(img, handLms, 
-                                               self.mpHands.HAND_CONNECTIONS)
-                    cv2.rectangle(img, (bbox[0] - 20, bbox[1] - 20), 
-                                  (bbox[0] + bbox[2] + 20, bbox[1] + bbox[3] + 20),
-                                  (255, 0, 255), 2)
-                    cv2.putText(img, myhand['type'], (bbox[0] - 30, bbox[1] - 30), cv2.FONT_HERSHEY_PLAIN, 
-                                2, (255, 0, 255), 2)
-                print(myhand)
+        if not self.results.multi_hand_landmarks:
+            return {"lmlist": np.empty((0, 21, 3), dtype=np.int32), "bbox": np.empty((0, 4), dtype=np.int32),
+                    "center": np.empty((0, 2), dtype=np.int32), "type": [],
+                    "fingers": np.empty((0, 5), dtype=np.int32), "landmarks": []}
+
+        ## Landmark ternormalisasi -> piksel untuk semua tangan sekaligus
+        norm = np.array([[(lm.x, lm.y, lm.z) for lm in handLms.landmark]
+                         for handLms in self.results.multi_hand_landmarks], dtype=np.float64)
+        lmArray = (norm * np.array([w, h, w], dtype=np.float64)).astype(np.int32)
+
+        ## Bounding Box & Center
+        mins = lmArray[:, :, :2].min(axis=1)
+        maxs = lmArray[:, :, :2].max(axis=1)
+        bboxes = np.concatenate([mins, maxs - mins], axis=1)
+        centers = bboxes[:, :2] + bboxes[:, 2:] // 2
+
+        labels = [handType.classification[0].label for handType in self.results.multi_handedness]
+        if flipType:
+            types = ['Kiri' if label == 'Right' else 'Kanan' for label in labels]
+        else:
+            types = labels
+
+        return {"lmlist": lmArray, "bbox": bboxes, "center": centers, "type": types,
+                "fingers": self.fingersUpArray(lmArray, types),
+                "landmarks": self.results.multi_hand_landmarks}
+
+    def fingersUpArray(self, lmArray, types):
+        ## Versi vectorized fingersUp untuk semua tangan: (hands, 21, 3) -> (hands, 5)
+        tipIds = np.array(self.tipIds)
+        if len(lmArray) == 0:
+            return np.empty((0, 5), dtype=np.int32)
+        isKanan = np.array([t == 'Kanan' for t in types])
+        ## Thumb
+        thumbTipX = lmArray[:, tipIds[0], 0]
+        thumbIpX = lmArray[:, tipIds[0] - 1, 0]
+        thumb = np.where(isKanan, thumbTipX > thumbIpX, thumbTipX < thumbIpX)
+        ## 4 Fingers
+        fingers = lmArray[:, tipIds[1:], 1] < lmArray[:, tipIds[1:] - 2, 1]
+        return np.concatenate([thumb[:, None], fingers], axis=1).astype(np.int32)
+
+    def findHands(self, img, draw=True, flipType=True):
+        ## View kompatibilitas berbasis dict di atas findHandsArray
+        handsArray = self.findHandsArray(img, flipType=flipType)
+        all_hands = []
+
+        for i, handLms in enumerate(handsArray["landmarks"]):
+            myhand = {}
+            bbox = tuple(int(v) for v in handsArray["bbox"][i])
+            myhand['lmlist'] = handsArray["lmlist"][i].tolist()
+            myhand['bbox'] = bbox
+            myhand['center'] = tuple(int(v) for v in handsArray["center"][i])
+            myhand['type'] = handsArray["type"][i]
+            all_hands.append(myhand)
+
+            ## Draw Bounding Box
+            if draw:
+                self.mpDraw.draw_landmarks(img, handLms, 
+                                           self.mpHands.HAND_CONNECTIONS)
+                cv2.rectangle(img, (bbox[0] - 20, bbox[1] - 20), 
+                              (bbox[0] + bbox[2] + 20, bbox[1] + bbox[3] + 20),
+                              (255, 0, 255), 2)
+                cv2.putText(img, myhand['type'], (bbox[0] - 30, bbox[1] - 30), cv2.FONT_HERSHEY_PLAIN, 
+                            2, (255, 0, 255), 2)
         if draw:
             return all_hands, img
         else:
@@ -78,26 +102,8 @@ class HandDetector:
         myHandType = myHand['type']
         mylmList = myHand['lmlist']
         if self.results.multi_hand_landmarks:
-            fingers = []
-            ## Thumb
-            if myHandType == 'Kanan':
-                if mylmList[self.tipIds[0]][0] > mylmList[self.tipIds[0] - 1][0]:
-                    fingers.append(1)
-                else:
-                    fingers.append(0)
-            else:
-                if mylmList[self.tipIds[0]][0] < mylmList[self.tipIds[0] - 1][0]:
-                    fingers.append(1)
-                else:
-                    fingers.append(0)
-                
-            ## 4 Fingers
-            for id in range(1, 5):
-                if mylmList[self.tipIds[id]][1] < mylmList[self.tipIds[id] - 2][1]:                        
-                    fingers.append(1)
-                else:
-                    fingers.append(0)
-            return fingers
+            fingers = self.fingersUpArray(np.asarray(mylmList)[None], [myHandType])
+            return fingers[0].tolist()
             
     def findDistance(self, p1, p2, img=None):
         x1, y1 = p1
@@ -114,12 +120,18 @@ class HandDetector:
         else:
             return length, info
 
-def main():
-    cap = cv2.VideoCapture(1)
+## source: index webcam, path video, atau rekaman replay (lihat frame_source.py)
+def main(source=1):
+    cap = create_source(source).open()
+    if cap is None:
+        print(f"Tidak dapat membuka sumber frame {source}")
+        return
     detector = HandDetector(detectionCon=0.8, maxHands=2)
     while True:
         ## Get Image Frame
         success, img = cap.read()
+        if not success:
+            break
         ## Find the hands and its landmarks
         hands, img = detector.findHands(img)
         ## hands = detector.findHands(img, draw=False) ## without drawing
@@ -150,4 +162,4 @@ def main():
         cv2.waitKey(1)
 
 if __name__ == "__main__":
-    main()
+    main(sys.argv[1] if len(sys.argv) > 1 else 1)
@@ -0,0 +1,179 @@
+import bisect
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+# Bucket default (detik) untuk latensi stage pipeline: 0.5 ms s/d 2.5 detik
+DEFAULT_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5)
+WINDOW_QUANTILES = (0.5, 0.95, 0.99)
+
+
+# --- Metrik Ringan untuk Endpoint /metrics (format teks Prometheus) ---
+# Overhead per observasi hanya satu lock + bisect, aman dibiarkan aktif permanen.
+
+# Nilai label di-escape sesuai format teks Prometheus (\\, \" dan \n); id sesi dan
+# spesifikasi kamera replay berasal dari input pengguna
+def _escape_label_value(value):
+    return str(value).replace("\\", "\\\\").replace('"', '\\"').replace("\n", "\\n")
+
+def _format_labels(labels, extra=None):
+    items = list(labels) + list(extra or ())
+    if not items:
+        return ""
+    return "{" + ",".join(f'{k}="{_escape_label_value(v)}"' for k, v in items) + "}"
+
+
+class Counter:
+    def __init__(self, name, help_text, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self._value = 0
+        self._lock = threading.Lock()
+
+    def inc(self, amount=1):
+        with self._lock:
+            self._value += amount
+
+    def value(self):
+        return self._value
+
+    def render(self):
+        return [f"{self.name}{_format_labels(self.labels)} {self._value}"]
+
+
+class Gauge:
+    # Nilai dibaca dari fungsi saat /metrics diakses (tidak ada biaya di hot path)
+    def __init__(self, name, help_text, fn, labels=()):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.fn = fn
+
+    def render(self):
+        try:
+            value = float(self.fn())
+        except Exception:
+            value = float("nan")
+        return [f"{self.name}{_format_labels(self.labels)} {value}"]
+
+
+class Histogram:
+    # Bucket kumulatif ala Prometheus + jendela bergulir sampel terbaru untuk kuantil
+    def __init__(self, name, help_text, labels=(), buckets=DEFAULT_BUCKETS, window=1024):
+        self.name = name
+        self.help_text = help_text
+        self.labels = labels
+        self.buckets = tuple(buckets)
+        self._counts = [0] * (len(self.buckets) + 1)  # Slot terakhir = +Inf
+        self._sum = 0.0
+        self._count = 0
+        self._window = deque(maxlen=window)
+        self._lock = threading.Lock()
+
+    def observe(self, value):
+        index = bisect.bisect_left(self.buckets, value)
+        with self._lock:
+            self._counts[index] += 1
+            self._sum += value
+            self._count += 1
+            self._window.append(value)
+
+    @contextmanager
+    def time(self):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(time.perf_counter() - start)
+
+    def window_quantiles(self, quantiles=WINDOW_QUANTILES):
+        with self._lock:
+            samples = sorted(self._window)
+        if not samples:
+            return {q: None for q in quantiles}
+        return {q: samples[min(len(samples) - 1, int(q * len(samples)))] for q in quantiles}
+
+    def render(self):
+        with self._lock:
+            counts = list(self._counts)
+            total, count = self._sum, self._count
+        lines = []
+        cumulative = 0
+        for bound, bucket_count in zip(self.buckets + (float("inf"),), counts):
+            cumulative += bucket_count
+            le = "+Inf" if bound == float("inf") else repr(bound)
+            lines.append(f"{self.name}_bucket{_format_labels(self.labels, [('le', le)])} {cumulative}")
+        lines.append(f"{self.name}_sum{_format_labels(self.labels)} {total}")
+        lines.append(f"{self.name}_count{_format_labels(self.labels)} {count}")
+        return lines
+
+    def render_window(self):
+        lines = []
+        for q, value in self.window_quantiles().items():
+            if value is not None:
+                lines.append(f"{self.name}_window{_format_labels(self.labels, [('quantile', q)])} {value}")
+        return lines
+
+
+class Registry:
+    def __init__(self):
+        self._metrics = {}  # (name, labels) -> metrik
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, help_text, labels, **kwargs):
+        labels = tuple(sorted((labels or {}).items()))
+        key = (name, labels)
+        metric = self._metrics.get(key)
+        if metric is None:
+            with self._lock:
+                metric = self._metrics.get(key)
+                if metric is None:
+                    metric = cls(name, help_text, labels=labels, **kwargs)
+                    self._metrics[key] = metric
+        return metric
+
+    def counter(self, name, help_text, labels=None):
+        return self._get_or_create(Counter, name, help_text, labels)
+
+    def histogram(self, name, help_text, labels=None, buckets=DEFAULT_BUCKETS):
+        return self._get_or_create(Histogram, name, help_text, labels, buckets=buckets)
+
+    def gauge(self, name, help_text, fn, labels=None):
+        return self._get_or_create(Gauge, name, help_text, labels, fn=fn)
+
+    def remove(self, name, labels=None):
+        with self._lock:
+            self._metrics.pop((name, tuple(sorted((labels or {}).items()))), None)
+
+    def render(self):
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda m: (m.name, m.labels))
+        lines = []
+        seen = set()
+        window_lines = []
+        for metric in metrics:
+            if metric.name not in seen:
+                seen.add(metric.name)
+                kind = {Counter: "counter", Gauge: "gauge", Histogram: "histogram"}[type(metric)]
+                lines.append(f"# HELP {metric.name} {metric.help_text}")
+                lines.append(f"# TYPE {metric.name} {kind}")
+            lines.extend(metric.render())
+            if isinstance(metric, Histogram):
+                window_lines.extend(metric.render_window())
+        if window_lines:
+            # Kuantil dari jendela sampel terbaru (bukan kumulatif sejak start)
+            for name in sorted({line.split("{", 1)[0] for line in window_lines}):
+                lines.append(f"# HELP {name} Rolling-window quantiles of recent observations")
+                lines.append(f"# TYPE {name} summary")
+                lines.extend(line for line in window_lines if line.startswith(name + "{"))
+        return "\n".join(lines) + "\n"
+
+
+# Registry global yang dipakai semua modul
+REGISTRY = Registry()
+counter = REGISTRY.counter
+histogram = REGISTRY.histogram
+gauge = REGISTRY.gauge
+render = REGISTRY.render
@@ -0,0 +1,98 @@
+import threading
+import time
+from collections import OrderedDict
+
+import cv2
+import numpy as np
+
+import metrics
+
+
+# --- Signature Frame (Thumbnail Grayscale) ---
+# Frame di-subsample (stride) lalu diperkecil ke size x size grayscale. Noise
+# sensor hilang karena dirata-rata per sel, sedangkan perubahan pose tangan
+# mengubah nilai beberapa sel secara signifikan.
+def frame_signature(image, size=16):
+    step = max(1, min(image.shape[:2]) // (size * 4))
+    small = cv2.resize(image[::step, ::step], (size, size), interpolation=cv2.INTER_AREA)
+    if small.ndim == 3:
+        small = cv2.cvtColor(small, cv2.COLOR_BGR2GRAY)
+    return small
+
+
+# Perbedaan terbesar antar sel (0-255); dipakai maksimum, bukan rata-rata, agar
+# perubahan kecil di satu area (misalnya satu jari) tetap terdeteksi
+def signature_distance(a, b):
+    return int(np.abs(a.astype(np.int16) - b).max())
+
+
+# --- Cache Hasil Prediksi ---
+# LRU kecil: signature frame (atau ROI tangan) -> hasil recognize. Saat pose
+# ditahan, frame berikutnya hampir identik sehingga hasil sebelumnya dipakai
+# ulang tanpa menjalankan model.
+#   tolerance: maksimal perbedaan nilai per sel thumbnail (0-255) agar dianggap sama
+#   ttl: umur maksimal hasil (detik) sejak model dijalankan; membatasi hasil basi
+#        selama pose ditahan lama (hit tidak memperpanjang umur)
+class PredictionCache:
+    def __init__(self, capacity=16, tolerance=8, ttl=0.5, signature_size=16, labels=None):
+        self.capacity = capacity
+        self.tolerance = tolerance
+        self.ttl = ttl
+        self.signature_size = signature_size
+        self._entries = OrderedDict()  # bytes signature -> (signature, waktu dibuat, hasil)
+        self._lock = threading.Lock()
+
+        self.hits = metrics.counter("sibi_prediction_cache_hits_total", "Predictions served from the cache", labels)
+        self.misses = metrics.counter("sibi_prediction_cache_misses_total", "Predictions that ran the model", labels)
+        self.expired = metrics.counter("sibi_prediction_cache_expired_total",
+                                       "Cache matches discarded because they exceeded the TTL", labels)
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+    def _find(self, signature, key, now):
+        # Cocok persis lebih dulu, lalu entri terbaru yang masih dalam toleransi
+        candidates = [key] if key in self._entries else []
+        candidates += [k for k, entry in reversed(self._entries.items())
+                       if k != key and signature_distance(entry[0], signature) <= self.tolerance]
+        for k in candidates:
+            _, created, result = self._entries[k]
+            if now - created > self.ttl:
+                del self._entries[k]
+                self.expired.inc()
+                continue
+            self._entries.move_to_end(k)
+            return result
+        return None
+
+    # Kembalikan hasil cache untuk image jika ada, atau jalankan compute_fn(image) dan simpan hasilnya
+    def get_or_compute(self, image, compute_fn):
+        signature = frame_signature(image, self.signature_size)
+        key = signature.tobytes()
+        with self._lock:
+            result = self._find(signature, key, time.monotonic())
+        if result is not None:
+            self.hits.inc()
+            return result
+
+        self.misses.inc()
+        result = compute_fn(image)
+        with self._lock:
+            self._entries[key] = (signature, time.monotonic(), result)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.capacity:
+                self._entries.popitem(last=False)
+        return result
+
+    def stats(self):
+        hits, misses = self.hits.value(), self.misses.value()
+        return {
+            "hits": hits,
+            "misses": misses,
+            "expired": self.expired.value(),
+            "hit_rate": round(hits / (hits + misses), 3) if hits + misses else 0.0,
+            "size": len(self._entries),
+            "tolerance": self.tolerance,
+            "ttl": self.ttl,
+        }
@@ -0,0 +1,58 @@
+import argparse
+import os
+import time
+
+from frame_source import RECORDING_EXTENSION, FrameRecorder, create_source
+
+# --- Rekam Frame untuk Replay ---
+# Merekam frame dari webcam (atau file video) ke file .sibirec yang bisa diputar
+# ulang sebagai kamera virtual, misalnya:
+#   python record_frames.py 1 -o recordings/session1.sibirec --duration 30 --landmarks
+#   SIBI_CAMERA="replay:recordings/session1.sibirec?speed=max" python app.py
+def main():
+    parser = argparse.ArgumentParser(description="Rekam frame kamera ke file replay (.sibirec).")
+    parser.add_argument("source", nargs="?", default="1", help="Index webcam atau path video (default: 1)")
+    parser.add_argument("-o", "--output", required=True, help=f"File rekaman output ({RECORDING_EXTENSION})")
+    parser.add_argument("--duration", type=float, default=None, help="Lama rekaman (detik); default sampai Ctrl+C")
+    parser.add_argument("--max-frames", type=int, default=None, help="Jumlah frame maksimal")
+    parser.add_argument("--width", type=int, default=1280, help="Lebar frame webcam")
+    parser.add_argument("--height", type=int, default=720, help="Tinggi frame webcam")
+    parser.add_argument("--jpeg-quality", type=int, default=90, help="Kualitas JPEG frame rekaman (1-100)")
+    parser.add_argument("--landmarks", action="store_true", help="Simpan juga landmark tangan (HandDetector)")
+    args = parser.parse_args()
+
+    if not args.output.endswith(RECORDING_EXTENSION):
+        parser.error(f"File output harus berakhiran {RECORDING_EXTENSION}")
+    cap = create_source(args.source, args.width, args.height).open()
+    if cap is None:
+        parser.error(f"Tidak dapat membuka sumber frame {args.source}")
+
+    detector = None
+    if args.landmarks:
+        from main import HandDetector
+        detector = HandDetector(maxHands=2)
+
+    start = time.time()
+    try:
+        with FrameRecorder(args.output, jpeg_quality=args.jpeg_quality) as recorder:
+            while args.max_frames is None or recorder.frames_written < args.max_frames:
+                if args.duration is not None and time.time() - start >= args.duration:
+                    break
+                success, frame = cap.read()
+                if not success:
+                    break
+                timestamp = time.time()
+                landmarks = detector.findHandsArray(frame)["lmlist"] if detector is not None else None
+                recorder.write(frame, timestamp, landmarks)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        cap.release()
+
+    elapsed = time.time() - start
+    size_mb = os.path.getsize(args.output) / 1e6
+    print(f"Selesai: {recorder.frames_written} frame direkam dalam {elapsed:.1f} detik ({size_mb:.1f} MB).")
+    print(f"Rekaman disimpan ke {args.output}")
+
+if __name__ == "__main__":
+    main()
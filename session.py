@@ -0,0 +1,460 @@
+import os
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+import metrics
+from camera import CameraCapture
+from decoder import SentenceDecoder
+from detection_log import DetectionLog
+from events import EventBroadcaster
+from frame_source import is_exclusive
+from inference import InferenceWorker, RoiTracker, create_engine, warm_up
+from prediction_cache import PredictionCache
+from streaming import FrameEncoder
+
+MAX_LOG_SIZE = 50    # Batasi ukuran log per sesi
+
+
+# --- Pool Recognizer Bersama ---
+# Sejumlah kecil engine pengenalan (lihat inference.create_engine) dipakai
+# bergantian oleh semua sesi. Engine tidak thread-safe, jadi setiap inferensi
+# meminjam satu engine secara eksklusif; jika semua sedang dipakai, worker
+# sesi menunggu giliran.
+# Model bisa dimuat ulang saat aplikasi berjalan: engine baru dibuat dan
+# di-warm-up di latar belakang, lalu ditukar secara atomik. Inferensi yang
+# sedang berjalan tetap memakai engine lama, yang ditutup saat dikembalikan.
+class RecognizerPool:
+    def __init__(self, model_path, size=2, engine="gesture_recognizer", warmup_frames=2):
+        self.model_path = model_path
+        self.size = size
+        self.engine = engine
+        self.warmup_frames = warmup_frames  # Jumlah inferensi dummy per engine sebelum dipakai
+        self.loading = False
+        self.last_error = None
+        self.loaded_at = None
+
+        self._pool = None  # Queue engine aktif; None = model belum dimuat
+        self._generation = 0
+        self._lock = threading.Lock()
+        self._load_lock = threading.Lock()  # Hanya satu proses load pada satu waktu
+
+        self.wait_seconds = metrics.histogram("sibi_recognizer_pool_wait_seconds",
+                                              "Time a session waits for a free recognizer")
+        self.load_seconds = metrics.histogram("sibi_model_load_seconds", "Model load + warm-up time",
+                                              buckets=(0.5, 1, 2.5, 5, 10, 30, 60))
+        metrics.gauge("sibi_recognizer_pool_available", "Idle recognizers in the pool",
+                      lambda: self._pool.qsize() if self._pool is not None else 0)
+        metrics.gauge("sibi_model_generation", "Number of times a model has been swapped in", lambda: self._generation)
+
+    @property
+    def ready(self):
+        return self._pool is not None
+
+    @property
+    def generation(self):
+        return self._generation
+
+    def _build_engines(self, engine, model_path):
+        engines = []
+        try:
+            for _ in range(self.size):
+                instance = create_engine(engine, model_path)
+                engines.append(instance)
+                warm_up(instance, self.warmup_frames)
+        except Exception:
+            for instance in engines:
+                instance.close()
+            raise
+        return engines
+
+    # Muat (atau muat ulang) model lalu tukar secara atomik. Raise jika gagal;
+    # dalam hal itu engine lama tetap dipakai.
+    def load(self, model_path=None, engine=None):
+        with self._load_lock:
+            model_path = model_path or self.model_path
+            engine = engine or self.engine
+            self.loading = True
+            start = time.perf_counter()
+            try:
+                engines = self._build_engines(engine, model_path)
+            except Exception as e:
+                self.last_error = str(e)
+                raise
+            finally:
+                self.loading = False
+            self.load_seconds.observe(time.perf_counter() - start)
+
+            new_pool = queue.Queue()
+            for instance in engines:
+                new_pool.put(instance)
+            with self._lock:
+                old_pool = self._pool
+                self._pool = new_pool
+                self._generation += 1
+                self.model_path = model_path
+                self.engine = engine
+                self.loaded_at = time.time()
+                self.last_error = None
+            # Tutup engine lama yang sedang idle; yang masih dipinjam ditutup saat dikembalikan
+            self._close_idle(old_pool)
+            print(f"Model '{model_path}' ({engine}) dimuat dan siap dipakai.")
+
+    # Jalankan load() di thread latar belakang. False jika proses load lain sedang berjalan.
+    def load_async(self, model_path=None, engine=None):
+        with self._lock:
+            # Cek dan tandai secara atomik agar dua permintaan reload bersamaan tidak sama-sama diterima
+            if self.loading:
+                return False
+            self.loading = True
+
+        def run():
+            try:
+                self.load(model_path, engine)
+            except Exception as e:
+                print(f"ERROR: Gagal memuat model '{model_path or self.model_path}': {e}")
+
+        threading.Thread(target=run, name="model-loader", daemon=True).start()
+        return True
+
+    @contextmanager
+    def acquire(self):
+        start = time.perf_counter()
+        while True:
+            with self._lock:
+                pool, generation = self._pool, self._generation
+            if pool is None:
+                raise RuntimeError("Model belum dimuat")
+            try:
+                # Timeout agar worker yang menunggu pool lama pindah ke pool baru setelah swap
+                recognizer = pool.get(timeout=0.5)
+                break
+            except queue.Empty:
+                continue
+        self.wait_seconds.observe(time.perf_counter() - start)
+        try:
+            yield recognizer
+        finally:
+            with self._lock:
+                if generation == self._generation:
+                    pool.put(recognizer)
+                    recognizer = None
+            if recognizer is not None:
+                recognizer.close() # Model sudah diganti saat engine ini dipinjam
+
+    def status(self):
+        return {
+            "ready": self.ready,
+            "loading": self.loading,
+            "model_path": self.model_path,
+            "engine": self.engine,
+            "generation": self._generation,
+            "loaded_at": self.loaded_at,
+            "last_error": self.last_error,
+        }
+
+    def _close_idle(self, pool):
+        while pool is not None:
+            try:
+                pool.get_nowait().close()
+            except queue.Empty:
+                break
+
+    def close(self):
+        with self._lock:
+            pool, self._pool = self._pool, None
+            self._generation += 1
+        self._close_idle(pool)
+
+
+# --- Pemantau File Model ---
+# Polling mtime/ukuran file model aktif; jika berubah (dan sudah stabil, tidak
+# sedang ditulis), model dimuat ulang di latar belakang tanpa menghentikan stream.
+class ModelWatcher:
+    def __init__(self, recognizer_pool, interval=5.0):
+        self.recognizer_pool = recognizer_pool
+        self.interval = interval
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="model-watcher", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+
+    def _stat(self, path):
+        try:
+            st = os.stat(path)
+            return st.st_mtime, st.st_size
+        except OSError:
+            return None
+
+    def _run(self):
+        watched_path = self.recognizer_pool.model_path
+        last_seen = self._stat(watched_path)
+        pending = None
+        while self._running:
+            time.sleep(self.interval)
+            if self.recognizer_pool.model_path != watched_path:
+                # Model diganti lewat endpoint admin: pantau file yang baru
+                watched_path = self.recognizer_pool.model_path
+                last_seen = self._stat(watched_path)
+                pending = None
+                continue
+            current = self._stat(watched_path)
+            if current is None or current == last_seen:
+                pending = None
+                continue
+            if current != pending:
+                # Tunggu satu interval lagi untuk memastikan file selesai ditulis
+                pending = current
+                continue
+            if not self.recognizer_pool.load_async():
+                # Load lain (misalnya reload admin) sedang berjalan: coba lagi di interval berikutnya
+                continue
+            print(f"File model '{watched_path}' berubah, memuat ulang...")
+            last_seen = current
+            pending = None
+
+
+# --- Pipeline per Sesi / Kamera ---
+# Satu sesi = satu sumber kamera beserta stream, worker inferensi, state
+# konfirmasi, kalimat, log, dan pengaturannya sendiri.
+class Session:
+    def __init__(self, session_id, camera_index, recognizer_pool, width=1280, height=720,
+                 jpeg_quality=80, output_width=None, max_fps=30, roi_inference=True, log_store=None,
+                 max_stream_clients=None, max_sse_clients=None, cache_ttl=0.5, cache_tolerance=8):
+        self.session_id = session_id
+        self.camera_index = camera_index
+        self.recognizer_pool = recognizer_pool
+        self.lock = threading.RLock()  # Lindungi state kalimat & log (diakses worker dan request)
+
+        # Pengaturan
+        self.mirror_mode = True  # Default mirror mode (True = mode cermin aktif)
+        self.max_sentence_length = 10  # Maksimal 10 kata dalam kalimat
+        self.roi_inference = roi_inference  # Deteksi pada frame diperkecil, lalu crop ke tangan & lewati frame saat tangan diam
+        self.cache_generation = None  # Generasi model saat isi cache prediksi dibuat
+
+        # Variabel untuk membangun kalimat
+        # threshold = confidence minimum, min_word_gap = jeda antar penambahan KATA,
+        # min_frames = jumlah hasil berturut-turut untuk konfirmasi
+        self.decoder = SentenceDecoder(threshold=0.5, smoothing=0.15, min_frames=3, hold_time=0.3, min_word_gap=1.0)
+        self.sentence_buffer = []
+        self.detection_log = DetectionLog(session_id, store=log_store, max_size=MAX_LOG_SIZE)   # Untuk menyimpan log deteksi
+        self.last_published_prediction = None  # Prediksi terakhir yang sudah di-push (hindari event duplikat)
+        self.closed = False  # True setelah stop(); stream klien yang masih terhubung diakhiri
+
+        # Komponen pipeline
+        labels = {"session": session_id}
+        self.camera = CameraCapture(camera_index, width=width, height=height)
+        self.events = EventBroadcaster(max_subscribers=max_sse_clients)
+        self.roi_tracker = RoiTracker(detection_width=640, roi_margin=0.5, static_threshold=0.02, max_skip=2)
+        # Cache hasil untuk frame/ROI yang hampir identik (pose ditahan); cache_ttl 0/None = nonaktif
+        self.prediction_cache = (PredictionCache(tolerance=cache_tolerance, ttl=cache_ttl, labels=labels)
+                                 if cache_ttl else None)
+        self.stream_encoder = FrameEncoder(self.camera, jpeg_quality=jpeg_quality, output_width=output_width,
+                                           max_fps=max_fps, mirror=self.mirror_mode, max_clients=max_stream_clients)
+        self.inference_worker = InferenceWorker(self.camera, self.predict_frame,
+                                                on_result=self.handle_inference_result, labels=labels)
+        self.stream_frames_dropped = metrics.counter("sibi_stream_frames_dropped_total",
+                                                     "Encoded frames skipped by slow /video_feed clients", labels)
+
+        # Gauge dibaca saat /metrics diakses
+        self._gauges = [
+            ("sibi_inference_fps", "Inference worker FPS (EMA)",
+             lambda: (self.inference_worker.get_result() or {}).get("fps", 0.0), labels),
+            ("sibi_stream_clients", "Connected /video_feed clients", self.stream_encoder.client_count, labels),
+            ("sibi_sse_clients", "Connected /stream_prediction clients", self.events.subscriber_count, labels),
+            ("sibi_camera_up", "1 if the camera is open", lambda: 1 if self.camera.is_opened() else 0, labels),
+        ]
+        for roi_mode in ("detect", "roi", "skipped"):
+            self._gauges.append(("sibi_roi_frames", "Frames handled by RoiTracker per mode",
+                                 lambda m=roi_mode: self.roi_tracker.stats[m], dict(labels, mode=roi_mode)))
+
+    def start(self):
+        for name, help_text, fn, labels in self._gauges:
+            metrics.gauge(name, help_text, fn, labels)
+        self.camera.start()
+        self.stream_encoder.start()
+        self.inference_worker.start()
+
+    def stop(self):
+        # Tandai lebih dulu agar generator /video_feed berhenti alih-alih mengirim frame error
+        self.closed = True
+        self.events.close()
+        self.stream_encoder.stop()
+        self.inference_worker.stop()
+        self.camera.stop()
+        for name, _, _, labels in self._gauges:
+            metrics.REGISTRY.remove(name, labels)
+
+    # Fungsi untuk memproses frame dan memprediksi gesture
+    def process_frame(self, frame, mirror=False):
+        if self.recognizer_pool is None or not self.recognizer_pool.ready:
+             return "Model Error", 0.0, None # Kembalikan error jika model tidak ada
+
+        try:
+            if self.roi_inference:
+                return self.roi_tracker.run(frame, self.recognize, mirror)
+            gesture, confidence, _, scores = self.recognize(frame, mirror)
+            return gesture, confidence, scores
+        except Exception as e:
+            print(f"[{self.session_id}] Error saat recognize: {e}")
+            return "Prediction Error", 0.0, None
+
+    # Jalankan model pada image (frame penuh atau ROI tangan). Engine dari pool hanya
+    # dipinjam jika hasilnya tidak ada di cache prediksi.
+    def recognize(self, image, mirror=False):
+        def run(image):
+            with self.recognizer_pool.acquire() as recognizer:
+                return recognizer.recognize(image, mirror)
+
+        if self.prediction_cache is None:
+            return run(image)
+        if self.cache_generation != self.recognizer_pool.generation:
+            # Model diganti: hasil lama tidak berlaku lagi
+            self.prediction_cache.clear()
+            self.cache_generation = self.recognizer_pool.generation
+        return self.prediction_cache.get_or_compute(image, run)
+
+    # Fungsi prediksi yang dijalankan worker untuk setiap frame baru
+    def predict_frame(self, frame):
+        # Mirror (untuk konsistensi dengan video feed) ditangani engine saat konversi
+        # warna / pada landmark, bukan dengan menyalin frame yang di-flip
+        return self.process_frame(frame, self.mirror_mode)
+
+    # --- Penambahan Kata ke Kalimat ---
+    # Setiap hasil inferensi masuk ke decoder streaming (lihat decoder.py);
+    # kata ditambahkan hanya saat decoder mengeluarkan kata baru
+    def update_sentence(self, detected_gesture_this_cycle, confidence_this_cycle, current_time, scores=None):
+        with self.lock:
+            emitted = self.decoder.update(detected_gesture_this_cycle, confidence_this_cycle, current_time,
+                                          scores=scores)
+            if emitted is None:
+                return
+            word, score = emitted
+            self.sentence_buffer.append(word)
+
+            # --- Aksi setelah penambahan berhasil ---
+            # 1. Log Deteksi (skor = hasil smoothing decoder); id dipakai klien untuk fetch ?since_id=
+            log_entry = self.detection_log.append(word, score)
+            self.events.publish("log", log_entry)
+
+            # 2. Batasi panjang kalimat
+            if len(self.sentence_buffer) > self.max_sentence_length:
+                self.sentence_buffer = self.sentence_buffer[-self.max_sentence_length:]
+            self.events.publish("sentence", {"sentence": " ".join(self.sentence_buffer)})
+
+    # Callback worker untuk setiap hasil inferensi baru
+    def handle_inference_result(self, gesture, confidence, current_time, scores=None):
+        self.update_sentence(gesture, confidence, current_time, scores)
+
+        # Push prediksi hanya jika berubah dari yang terakhir dikirim
+        prediction = {"gesture": gesture, "confidence": round(confidence, 2)}
+        if prediction != self.last_published_prediction:
+            self.last_published_prediction = prediction
+            self.events.publish("prediction", prediction)
+
+    def set_mirror(self, mirror_mode):
+        self.mirror_mode = mirror_mode
+        self.stream_encoder.mirror = mirror_mode
+        self.roi_tracker.reset() # Posisi ROI tidak berlaku lagi setelah frame di-flip
+        if self.prediction_cache is not None:
+            self.prediction_cache.clear() # Signature cache dihitung dari frame sebelum di-flip
+
+    def clear_sentence(self):
+        with self.lock:
+            self.sentence_buffer = []
+            self.decoder.reset()
+        self.events.publish("sentence", {"sentence": ""})
+
+    def get_sentence(self):
+        with self.lock:
+            return " ".join(self.sentence_buffer) # Kalimat yang sudah terbangun (terkonfirmasi)
+
+    def get_log(self):
+        # Terbaru di atas saat ditampilkan (langsung dari ring buffer, tidak menyentuh disk)
+        return self.detection_log.recent()
+
+    # Snapshot prediksi terakhir untuk /get_prediction
+    def get_prediction(self):
+        # Validasi awal: Kamera dan Model harus siap
+        if not self.camera.is_opened():
+            return {"gesture": "Gagal Membuka Kamera", "confidence": 0.0, "sentence": self.get_sentence()}
+        if self.recognizer_pool is not None and self.recognizer_pool.loading and not self.recognizer_pool.ready:
+            return {"gesture": "Memuat Model", "confidence": 0.0, "sentence": self.get_sentence()}
+        if self.recognizer_pool is None or not self.recognizer_pool.ready:
+            return {"gesture": "Model Error", "confidence": 0.0, "sentence": self.get_sentence()}
+
+        # Ambil hasil terakhir dari worker inferensi (tanpa menjalankan model di sini)
+        result = self.inference_worker.get_result()
+        if result is None:
+            # Worker belum menghasilkan prediksi pertama
+            return {"gesture": "Belum ada prediksi", "confidence": 0.0, "sentence": self.get_sentence()}
+
+        # Kembalikan hasil deteksi MENTAH terakhir untuk ditampilkan di #result
+        return {
+            "gesture": result["gesture"],
+            "confidence": round(result["confidence"], 2),
+            "sentence": self.get_sentence(),
+            "inference_fps": round(result["fps"], 1), # FPS worker inferensi
+            "result_age": round(result["age"], 3) # Umur hasil (detik) sejak frame ditangkap
+        }
+
+    def describe(self):
+        return {
+            "session_id": self.session_id,
+            "camera_index": self.camera_index,
+            "camera_opened": self.camera.is_opened(),
+            "mirror_mode": self.mirror_mode,
+            "decoder": self.decoder.get_settings(),
+            "prediction_cache": self.prediction_cache.stats() if self.prediction_cache is not None else None,
+        }
+
+
+# --- Manajer Sesi ---
+class SessionManager:
+    def __init__(self, recognizer_pool, **session_options):
+        self.recognizer_pool = recognizer_pool
+        self.session_options = session_options  # Opsi default untuk setiap Session baru
+        self._sessions = {}
+        self._lock = threading.Lock()
+
+    def create(self, session_id, camera_index, **options):
+        with self._lock:
+            if session_id in self._sessions:
+                raise ValueError(f"Sesi '{session_id}' sudah ada")
+            # Webcam fisik hanya bisa dibuka satu sesi; replay/file video boleh dipakai bersama (uji beban)
+            if is_exclusive(camera_index) and any(s.camera_index == camera_index for s in self._sessions.values()):
+                raise ValueError(f"Kamera {camera_index} sudah dipakai sesi lain")
+            session = Session(session_id, camera_index, self.recognizer_pool, **dict(self.session_options, **options))
+            self._sessions[session_id] = session
+        session.start()
+        print(f"Sesi '{session_id}' dimulai dengan kamera {camera_index}.")
+        return session
+
+    def get(self, session_id):
+        with self._lock:
+            return self._sessions.get(session_id)
+
+    def remove(self, session_id):
+        with self._lock:
+            session = self._sessions.pop(session_id, None)
+        if session is not None:
+            session.stop()
+            print(f"Sesi '{session_id}' dihentikan.")
+        return session
+
+    def list(self):
+        with self._lock:
+            return list(self._sessions.values())
+
+    def stop_all(self):
+        for session in self.list():
+            self.remove(session.session_id)
@@ -0,0 +1,124 @@
+import threading
+import time
+
+import cv2
+
+import metrics
+from frame_buffer import FrameBuffer
+
+JPEG_ENCODE_SECONDS = metrics.histogram("sibi_jpeg_encode_seconds", "Time spent in cv2.imencode for the stream")
+
+
+# --- Encoder Stream MJPEG Bersama ---
+# Setiap frame kamera di-encode ke JPEG tepat satu kali, lalu byte yang sama
+# dikirim ke semua klien /video_feed. Klien lambat otomatis melewatkan frame
+# (selalu mengambil hasil encode terbaru) sehingga tidak menahan kamera.
+# Encoder hanya bekerja jika ada klien yang terhubung.
+class FrameEncoder:
+    def __init__(self, camera, jpeg_quality=80, output_width=None, max_fps=30.0, mirror=True, max_clients=None):
+        self.camera = camera
+        self.jpeg_quality = jpeg_quality  # Kualitas JPEG (1-100)
+        self.output_width = output_width  # Lebar output; None = resolusi asli kamera
+        self.max_fps = max_fps  # Batas FPS encode; None/0 = ikuti FPS kamera
+        self.mirror = mirror  # Flip horizontal untuk efek cermin
+        self.max_clients = max_clients  # Batas klien bersamaan; None = tanpa batas
+
+        # Buffer downscale & flip yang dipakai ulang (encode hanya dipanggil dari satu thread)
+        self._resize_buffer = FrameBuffer()
+        self._flip_buffer = FrameBuffer()
+        self._condition = threading.Condition()
+        self._encoded = None  # (encoded_id, frame_bytes)
+        self._encoded_id = 0
+        self._clients = 0
+        self._running = False
+        self._thread = None
+
+    def start(self):
+        if self._running:
+            return
+        self._running = True
+        self._thread = threading.Thread(target=self._run, name="stream-encoder", daemon=True)
+        self._thread.start()
+
+    def stop(self):
+        self._running = False
+        with self._condition:
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout=2.0)
+            self._thread = None
+
+    # Daftarkan klien baru. False jika batas klien sudah tercapai.
+    def add_client(self):
+        with self._condition:
+            if self.max_clients is not None and self._clients >= self.max_clients:
+                return False
+            self._clients += 1
+            self._condition.notify_all()
+            return True
+
+    def remove_client(self):
+        with self._condition:
+            self._clients = max(0, self._clients - 1)
+
+    def client_count(self):
+        with self._condition:
+            return self._clients
+
+    def encode(self, frame):
+        # Downscale dulu agar flip & encode bekerja pada frame yang lebih kecil
+        if self.output_width and frame.shape[1] > self.output_width:
+            scale = self.output_width / frame.shape[1]
+            size = (self.output_width, int(round(frame.shape[0] * scale)))
+            frame = cv2.resize(frame, size, dst=self._resize_buffer.get((size[1], size[0], 3)),
+                               interpolation=cv2.INTER_AREA)
+        if self.mirror:
+            frame = cv2.flip(frame, 1, dst=self._flip_buffer.get(frame.shape))
+        with JPEG_ENCODE_SECONDS.time():
+            ret, buffer = cv2.imencode('.jpg', frame, [cv2.IMWRITE_JPEG_QUALITY, int(self.jpeg_quality)])
+        return buffer.tobytes() if ret else None
+
+    def _run(self):
+        last_frame_id = 0
+        last_encode_time = 0.0
+        while self._running:
+            # Jangan encode apa pun jika tidak ada klien yang menonton
+            with self._condition:
+                while self._running and self._clients == 0:
+                    self._condition.wait(1.0)
+            if not self._running:
+                break
+
+            # Batasi FPS encode
+            if self.max_fps:
+                wait = (1.0 / self.max_fps) - (time.time() - last_encode_time)
+                if wait > 0:
+                    time.sleep(wait)
+
+            latest = self.camera.wait_for_frame(last_frame_id, timeout=1.0)
+            if latest is None:
+                continue
+            last_frame_id, _, frame = latest
+
+            last_encode_time = time.time()
+            frame_bytes = self.encode(frame)
+            if frame_bytes is None:
+                print("Gagal encode frame ke JPEG")
+                continue
+
+            with self._condition:
+                self._encoded_id += 1
+                self._encoded = (self._encoded_id, frame_bytes)
+                self._condition.notify_all()
+
+    # Tunggu hasil encode yang lebih baru dari last_encoded_id.
+    # Mengembalikan (encoded_id, frame_bytes) atau None jika timeout.
+    def wait_for_encoded(self, last_encoded_id=0, timeout=1.0):
+        deadline = time.time() + timeout
+        with self._condition:
+            while self._encoded is None or self._encoded[0] <= last_encoded_id:
+                remaining = deadline - time.time()
+                if remaining <= 0 or not self._running:
+                    return None
+                self._condition.wait(remaining)
+            return self._encoded
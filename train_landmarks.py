@@ -0,0 +1,283 @@
+import argparse
+import csv
+import hashlib
+import os
+import time
+from multiprocessing import Pool
+
+import cv2
+import numpy as np
+
+from batch_recognize import IMAGE_EXTENSIONS
+from landmark_classifier import LandmarkClassifier, normalize_landmarks
+
+NO_HAND_LABEL = "Tidak dikenali"
+
+# --- Pipeline Training Classifier Landmark ---
+# Versi script dari bagian "Classifier Landmark Ringan" di notebook training:
+#   1. Hash isi setiap gambar dataset (root/<label>/<gambar>) secara paralel
+#   2. Ekstraksi landmark paralel (satu HandDetector per proses) hanya untuk gambar
+#      yang belum ada di cache; cache disimpan di disk dengan key hash isi gambar
+#   3. Split train/validasi/test berdasarkan hash (stabil walau dataset bertambah)
+#   4. Training MLP (TensorFlow) lalu ekspor ke .npz untuk LandmarkClassifier
+#   5. Evaluasi dengan LandmarkClassifier (jalur yang sama dengan app.py):
+#      confusion matrix per kelas dan latensi per gambar
+# Contoh:
+#   python train_landmarks.py /path/to/SIBI/training -o models/landmark_classifier.npz --workers 8
+#   python train_landmarks.py /path/to/SIBI/training --evaluate models/landmark_classifier.npz
+
+# Detector milik masing-masing proses worker (dibuat sekali per proses, saat
+# pertama dibutuhkan agar rerun yang seluruhnya dari cache tidak memuat MediaPipe)
+_detector = None
+_detection_confidence = 0.5
+
+def _init_worker(detection_confidence):
+    global _detection_confidence
+    # Batasi thread OpenCV per proses agar tidak berebut core dengan worker lain
+    cv2.setNumThreads(1)
+    _detection_confidence = detection_confidence
+
+def _hash_file(path):
+    with open(path, "rb") as f:
+        return hashlib.sha256(f.read()).hexdigest()
+
+# Ekstraksi satu gambar: (hash, landmark (21, 3) atau None, latensi deteksi ms)
+def _extract(item):
+    global _detector
+    path, content_hash = item
+    if _detector is None:
+        from main import HandDetector
+        # Landmark diambil dengan HandDetector.findHandsArray, sama seperti LandmarkEngine saat inferensi
+        _detector = HandDetector(mode=True, maxHands=1, detectionCon=_detection_confidence)
+    image = cv2.imread(path)
+    if image is None:
+        print(f"PERINGATAN: Gagal membaca gambar {path}")
+        return content_hash, None, 0.0
+    start = time.perf_counter()
+    hands = _detector.findHandsArray(image)
+    detect_ms = (time.perf_counter() - start) * 1000
+    landmarks = hands["lmlist"][0] if len(hands["lmlist"]) else None
+    return content_hash, landmarks, detect_ms
+
+# Dataset SIBI: root/<label>/<gambar> -> [(path, label)], label diurutkan A-Z
+def scan_dataset(dataset_path):
+    labels = sorted(d for d in os.listdir(dataset_path) if os.path.isdir(os.path.join(dataset_path, d)))
+    items = []
+    for label in labels:
+        for root, dirs, files in os.walk(os.path.join(dataset_path, label)):
+            dirs.sort()
+            for name in sorted(files):
+                if name.lower().endswith(IMAGE_EXTENSIONS):
+                    items.append((os.path.join(root, name), label))
+    return labels, items
+
+
+# --- Cache Landmark di Disk ---
+# Satu file .npz per konfigurasi ekstraksi: hash isi gambar -> landmark (21, 3),
+# ditemukan/tidak, dan latensi deteksi saat diekstraksi.
+class LandmarkCache:
+    def __init__(self, cache_dir, detection_confidence):
+        self.path = os.path.join(cache_dir, f"landmarks_conf{detection_confidence:g}.npz")
+        self.entries = {}  # hash -> (landmarks atau None, detect_ms)
+        if os.path.isfile(self.path):
+            data = np.load(self.path, allow_pickle=False)
+            for content_hash, landmarks, found, detect_ms in zip(data["hashes"], data["landmarks"],
+                                                                 data["found"], data["detect_ms"]):
+                self.entries[str(content_hash)] = (landmarks if found else None, float(detect_ms))
+
+    def __contains__(self, content_hash):
+        return content_hash in self.entries
+
+    def save(self):
+        os.makedirs(os.path.dirname(self.path) or ".", exist_ok=True)
+        hashes = list(self.entries)
+        landmarks = np.zeros((len(hashes), 21, 3), dtype=np.int32)
+        found = np.zeros(len(hashes), dtype=bool)
+        for i, content_hash in enumerate(hashes):
+            points = self.entries[content_hash][0]
+            if points is not None:
+                landmarks[i] = points
+                found[i] = True
+        tmp_path = self.path[:-len(".npz")] + ".tmp.npz"
+        np.savez(tmp_path, hashes=np.array(hashes, dtype="U64"), landmarks=landmarks, found=found,
+                 detect_ms=np.array([self.entries[h][1] for h in hashes], dtype=np.float32))
+        os.replace(tmp_path, self.path)  # Tulis atomik agar cache tidak rusak jika dihentikan
+
+
+def extract_landmarks(items, cache, workers, detection_confidence):
+    with Pool(processes=max(1, workers), initializer=_init_worker, initargs=(detection_confidence,)) as pool:
+        hashes = pool.map(_hash_file, [path for path, _ in items], chunksize=64)
+        pending = [(path, content_hash) for (path, _), content_hash in zip(items, hashes)
+                   if content_hash not in cache]
+        print(f"[INFO] {len(items)} gambar, {len(items) - len(pending)} dari cache, {len(pending)} diekstraksi")
+        start = time.time()
+        try:
+            for done, (content_hash, landmarks, detect_ms) in enumerate(
+                    pool.imap_unordered(_extract, pending, chunksize=8), 1):
+                cache.entries[content_hash] = (landmarks, detect_ms)
+                if done % 500 == 0:
+                    print(f"[INFO] {done}/{len(pending)} gambar diekstraksi")
+        finally:
+            # Simpan juga hasil parsial (misalnya jika dihentikan dengan Ctrl+C)
+            if pending:
+                cache.save()
+        if pending:
+            print(f"[INFO] Ekstraksi selesai dalam {time.time() - start:.1f} detik")
+    return hashes
+
+
+# Split berdasarkan hash isi: gambar yang sama selalu masuk split yang sama
+def split_of(content_hash, test_percent, val_percent):
+    bucket = int(content_hash[:8], 16) % 100
+    if bucket < test_percent:
+        return "test"
+    if bucket < test_percent + val_percent:
+        return "val"
+    return "train"
+
+
+def train_classifier(X_train, y_train, X_val, y_val, num_labels, epochs, batch_size, seed):
+    import tensorflow as tf
+    tf.random.set_seed(seed)
+    model = tf.keras.Sequential([
+        tf.keras.layers.Input(shape=(X_train.shape[1],)),
+        tf.keras.layers.Dense(128, activation="relu"),
+        tf.keras.layers.Dropout(0.2),
+        tf.keras.layers.Dense(64, activation="relu"),
+        tf.keras.layers.Dense(num_labels),  # Softmax dihitung di landmark_classifier.py
+    ])
+    model.compile(optimizer="adam",
+                  loss=tf.keras.losses.SparseCategoricalCrossentropy(from_logits=True),
+                  metrics=["accuracy"])
+    model.fit(X_train, y_train, validation_data=(X_val, y_val) if len(X_val) else None,
+              epochs=epochs, batch_size=batch_size, shuffle=True,
+              callbacks=[tf.keras.callbacks.EarlyStopping(monitor="val_loss" if len(X_val) else "loss",
+                                                         patience=20, restore_best_weights=True)])
+    # Bobot Dense (W0, b0, W1, b1, ...) untuk LandmarkClassifier
+    weights = {}
+    dense_layers = [layer for layer in model.layers if isinstance(layer, tf.keras.layers.Dense)]
+    for i, layer in enumerate(dense_layers):
+        weights[f"W{i}"], weights[f"b{i}"] = layer.get_weights()
+    return weights
+
+
+# Evaluasi per gambar dengan LandmarkClassifier; gambar tanpa tangan terdeteksi
+# dihitung sebagai prediksi "Tidak dikenali"
+def evaluate(classifier, samples):
+    rows = []
+    for path, label, landmarks, detect_ms in samples:
+        if landmarks is None:
+            predicted, confidence, classify_ms = NO_HAND_LABEL, 0.0, 0.0
+        else:
+            start = time.perf_counter()
+            predicted, confidence = classifier.classify(landmarks[None])[0]
+            classify_ms = (time.perf_counter() - start) * 1000
+        rows.append({"path": path, "label": label, "predicted": predicted, "confidence": round(confidence, 4),
+                     "detect_ms": round(detect_ms, 2), "classify_ms": round(classify_ms, 3)})
+    return rows
+
+
+def write_reports(rows, labels, report_dir):
+    os.makedirs(report_dir, exist_ok=True)
+    columns = labels + [NO_HAND_LABEL]
+    index = {label: i for i, label in enumerate(columns)}
+    matrix = np.zeros((len(labels), len(columns)), dtype=np.int64)
+    for row in rows:
+        if row["predicted"] in index:
+            matrix[index[row["label"]], index[row["predicted"]]] += 1
+
+    # Confusion matrix: baris = label sebenarnya, kolom = prediksi
+    with open(os.path.join(report_dir, "confusion_matrix.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.writer(f)
+        writer.writerow(["label"] + columns)
+        for label, counts in zip(labels, matrix):
+            writer.writerow([label] + counts.tolist())
+    with open(os.path.join(report_dir, "per_image.csv"), "w", newline="", encoding="utf-8") as f:
+        writer = csv.DictWriter(f, fieldnames=list(rows[0]) if rows else ["path"])
+        writer.writeheader()
+        writer.writerows(rows)
+
+    print(f"{'label':<12}{'n':>6}{'precision':>11}{'recall':>8}{'f1':>7}{'no hand':>9}")
+    for i, label in enumerate(labels):
+        support = matrix[i].sum()
+        predicted = matrix[:, i].sum()
+        precision = matrix[i, i] / predicted if predicted else 0.0
+        recall = matrix[i, i] / support if support else 0.0
+        f1 = 2 * precision * recall / (precision + recall) if precision + recall else 0.0
+        print(f"{label:<12}{support:>6}{precision:>11.3f}{recall:>8.3f}{f1:>7.3f}{matrix[i, -1]:>9}")
+    correct = int(np.trace(matrix[:, :len(labels)]))
+    total = int(matrix.sum())
+    detect_ms = np.array([row["detect_ms"] for row in rows if row["detect_ms"] > 0])
+    classify_ms = np.array([row["classify_ms"] for row in rows if row["predicted"] != NO_HAND_LABEL])
+    if total:
+        print(f"[INFO] accuracy (landmark): {100.0 * correct / total:.2f}% ({correct}/{total})")
+    if len(detect_ms):
+        print(f"[INFO] Latensi deteksi landmark: p50 {np.percentile(detect_ms, 50):.1f} ms, "
+              f"p95 {np.percentile(detect_ms, 95):.1f} ms")
+    if len(classify_ms):
+        print(f"[INFO] Latensi classifier: p50 {np.percentile(classify_ms, 50):.3f} ms, "
+              f"p95 {np.percentile(classify_ms, 95):.3f} ms")
+    print(f"[INFO] Laporan disimpan ke {report_dir}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Training & evaluasi classifier landmark SIBI dengan cache landmark.")
+    parser.add_argument("dataset", help="Folder dataset (root/<label>/<gambar>)")
+    parser.add_argument("-o", "--output", default="models/landmark_classifier.npz", help="File .npz hasil training")
+    parser.add_argument("--evaluate", metavar="MODEL", help="Hanya evaluasi model .npz yang sudah ada (tanpa training)")
+    parser.add_argument("--workers", type=int, default=os.cpu_count() or 1, help="Jumlah proses worker ekstraksi")
+    parser.add_argument("--cache-dir", default=".cache/landmarks", help="Folder cache landmark")
+    parser.add_argument("--report-dir", default="reports/landmark", help="Folder laporan evaluasi")
+    parser.add_argument("--detection-confidence", type=float, default=0.5, help="min_detection_confidence MediaPipe")
+    parser.add_argument("--test-percent", type=int, default=20, help="Persentase gambar untuk test")
+    parser.add_argument("--val-percent", type=int, default=8, help="Persentase gambar untuk validasi")
+    parser.add_argument("--epochs", type=int, default=200)
+    parser.add_argument("--batch-size", type=int, default=32)
+    parser.add_argument("--seed", type=int, default=42)
+    parser.add_argument("--eval-split", default="test", choices=("test", "all"),
+                        help="Gambar yang dievaluasi (all = seluruh dataset, misalnya folder testing terpisah)")
+    args = parser.parse_args()
+
+    if args.evaluate and not os.path.isfile(args.evaluate):
+        parser.error(f"File model tidak ditemukan: {args.evaluate}")
+    labels, items = scan_dataset(args.dataset)
+    if not items:
+        parser.error(f"Tidak ada gambar di {args.dataset}")
+    print(f"[INFO] {len(labels)} kelas: {labels}")
+
+    cache = LandmarkCache(args.cache_dir, args.detection_confidence)
+    hashes = extract_landmarks(items, cache, args.workers, args.detection_confidence)
+
+    samples = {"train": [], "val": [], "test": []}
+    for (path, label), content_hash in zip(items, hashes):
+        landmarks, detect_ms = cache.entries[content_hash]
+        split = split_of(content_hash, args.test_percent, args.val_percent)
+        samples[split].append((path, label, landmarks, detect_ms))
+
+    model_path = args.evaluate
+    if model_path is None:
+        label_index = {label: i for i, label in enumerate(labels)}
+
+        def to_arrays(split_samples):
+            found = [(landmarks, label) for _, label, landmarks, _ in split_samples if landmarks is not None]
+            X = normalize_landmarks([landmarks for landmarks, _ in found]) if found else np.empty((0, 63), np.float32)
+            return X, np.array([label_index[label] for _, label in found], dtype=np.int64)
+
+        X_train, y_train = to_arrays(samples["train"])
+        X_val, y_val = to_arrays(samples["val"])
+        print(f"[INFO] {len(X_train)} sampel train, {len(X_val)} validasi")
+        weights = train_classifier(X_train, y_train, X_val, y_val, len(labels), args.epochs, args.batch_size, args.seed)
+        os.makedirs(os.path.dirname(args.output) or ".", exist_ok=True)
+        np.savez(args.output, labels=np.array(labels), **weights)
+        print(f"[INFO] Model disimpan ke {args.output}")
+        model_path = args.output
+
+    classifier = LandmarkClassifier(model_path)
+    unknown = sorted(set(labels) - set(classifier.labels))
+    if unknown:
+        print(f"PERINGATAN: Kelas tidak dikenal model: {unknown}")
+    eval_samples = samples["test"] if args.eval_split == "test" else [s for split in samples.values() for s in split]
+    write_reports(evaluate(classifier, eval_samples), labels, args.report_dir)
+
+if __name__ == "__main__":
+    main()